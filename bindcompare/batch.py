@@ -0,0 +1,232 @@
+import argparse
+import glob
+import os
+from datetime import datetime
+from multiprocessing import Pool
+
+from .bindapp.options import ENGINES, PLOT_MODES
+from .bindcompare import (
+    is_valid_file,
+    is_valid_directory,
+    is_valid_scope,
+    is_valid_threads,
+)
+
+# Shared, read-only state for the workers: the reference index, genes and genome.
+BATCH_STATE = {}
+
+
+def init_worker(state: dict):
+    BATCH_STATE.update(state)
+
+
+def experiment_name(exp_path: str):
+    """Returns the output name for an experimental BED file."""
+    name = os.path.basename(exp_path)
+    for ext in [".gz", ".bed", ".narrowPeak", ".broadPeak"]:
+        if name.endswith(ext):
+            name = name[: -len(ext)]
+    return name
+
+
+def expand_experiments(patterns: list):
+    """Expands glob patterns and returns the experimental BED files in order."""
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        files.extend(match for match in matches if match not in files)
+    return files
+
+
+def run_experiment(exp_path: str):
+    """Compares one experimental BED file against the shared reference."""
+    import numpy as np
+    from .bindapp import downstream, merge
+    from .bindapp.exp_class import BindCompare
+    from .bindapp.merge_class import Bed
+
+    state = BATCH_STATE
+    name = experiment_name(exp_path)
+    outdir = os.path.join(state["out"], name) + "/"
+    os.makedirs(outdir, exist_ok=True)
+
+    exp_bed = Bed(exp_path, columnar=True, cache_dir=state["cache_dir"])
+    exp_bed.process_bed(False, state["scope"])
+    exp = BindCompare(state["ref_bed"], exp_bed, state["scope"], state["engine"])
+    exp.compare_binds()
+    bc_dict = merge.write_results(exp, name, outdir, state["gtf"], state["plots"])
+    downstream.downstream(
+        outdir + f"{name}_overlaps.csv",
+        state["fasta"],
+        outdir,
+        state["chrom2seq"],
+        bc_dict["overlap_table"],
+    )
+
+    counts = bc_dict["overlap_counts"]
+    row = {
+        "Experiment": name,
+        "Experimental Peaks": exp_bed.num_peaks,
+        "Total Overlaps": counts["Total"],
+        "CRO": counts["CRO"],
+        "ORF": counts["ORF"],
+        "ORE": counts["ORE"],
+        "PXP": counts["PXP"],
+        "Unique Overlaps": np.count_nonzero(bc_dict["unique_ola_overlaps"]),
+        "Reference Peaks Overlapped": np.count_nonzero(bc_dict["unique_ref_overlaps"]),
+    }
+    if state["gtf"] is not None:
+        row["Genes Overlapped"] = len(bc_dict["all_genes"])
+    os.write(1, f"Finished {name}.\n".encode())
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="bindbatch: Compare one reference BED file against many experimental BED files."
+    )
+
+    parser.add_argument(
+        "-r",
+        "--ref",
+        required=True,
+        type=lambda x: is_valid_file(parser, x, "reference BED"),
+        help="The file path for your reference BED file.",
+    )
+    parser.add_argument(
+        "-e",
+        "--exp",
+        required=True,
+        nargs="+",
+        help="Experimental BED files or quoted glob patterns (e.g. 'beds/*.bed').",
+    )
+    parser.add_argument(
+        "-s",
+        "--scope",
+        required=True,
+        type=lambda x: is_valid_scope(parser, x),
+        help="Nucleotides upstream and downstream from the ref peak's center that BC will search for peaks.",
+    )
+    parser.add_argument(
+        "-n", "--name", required=True, help="Str name for this batch of experiments."
+    )
+    parser.add_argument(
+        "-o",
+        "--out",
+        required=True,
+        type=lambda x: is_valid_directory(parser, x, "output"),
+        help="Output Directory. Each experiment gets its own sub-directory.",
+    )
+    parser.add_argument(
+        "-g",
+        "--gtf",
+        default="None",
+        help="Gene GTF file (may be gzipped) in proper format, or 'dm6' for the bundled annotation.",
+    )
+    parser.add_argument(
+        "--gtf-feature",
+        default="gene",
+        help="GTF feature type (column 3) used for gene annotation, or 'all' for every row.",
+    )
+    parser.add_argument(
+        "-f",
+        "--fasta",
+        default="None",
+        help="Genome file corresponding to your BED Files.",
+    )
+    parser.add_argument(
+        "--engine",
+        default="numpy",
+        choices=ENGINES,
+        help="Overlap engine. 'intervaltree' is the original per-peak search, kept for cross-checking.",
+    )
+    parser.add_argument(
+        "-t",
+        "--threads",
+        "--workers",
+        default=1,
+        type=lambda x: is_valid_threads(parser, x),
+        help="Number of worker processes. Experiments are compared in parallel.",
+    )
+    parser.add_argument(
+        "--cache",
+        default=None,
+        help="Directory for cached parsed BED files. Reused while the BED file is unchanged.",
+    )
+    parser.add_argument(
+        "--plots",
+        default="full",
+        choices=PLOT_MODES,
+        help="'full' renders 300 dpi plots, 'fast' low-resolution previews and 'none' skips plotting.",
+    )
+
+    args = parser.parse_args()
+
+    # Imported once the arguments are valid, so that --help and errors return quickly.
+    import pandas as pd
+    from . import retrieve
+    from .bindapp import downstream
+    from .bindapp.merge_class import Bed, GTF, feature_option
+    from .bindapp.utils import user_cache_dir
+
+    args.gtf = retrieve.resolve_gtf(args.gtf)
+    if args.gtf != "None" and not os.path.isfile(args.gtf):
+        parser.error(f"Valid GTF file not provided.")
+
+    if args.fasta != "None" and not os.path.isfile(args.fasta):
+        parser.error(f"Valid FASTA file not provided.")
+
+    experiments = expand_experiments(args.exp)
+    if len(experiments) == 0:
+        parser.error("No experimental BED files found.")
+    for exp_path in experiments:
+        is_valid_file(parser, exp_path, "overlayed BED")
+    names = [experiment_name(exp_path) for exp_path in experiments]
+    if len(set(names)) != len(names):
+        parser.error("Experimental BED files must have distinct file names.")
+
+    os.write(1, b"Beginning BindCompare batch!\n")
+
+    # Build everything shared by the experiments once.
+    ref_bed = Bed(args.ref, columnar=True, cache_dir=args.cache)
+    ref_bed.process_bed(True, args.scope)
+    if args.engine == "intervaltree":
+        for chrom in ref_bed.get_chroms():
+            ref_bed.get_chrom_it(chrom)
+
+    gtf = None
+    if args.gtf != "None":
+        gtf = GTF(
+            args.gtf,
+            feature_option(args.gtf_feature),
+            cache_dir=args.cache or user_cache_dir(),
+        )
+        gtf.process_gtf()
+
+    chrom2seq = None
+    if args.fasta != "None":
+        chrom2seq = downstream.get_chrom2seq(args.fasta)
+
+    state = {
+        "ref_bed": ref_bed,
+        "gtf": gtf,
+        "chrom2seq": chrom2seq,
+        "fasta": args.fasta,
+        "scope": args.scope,
+        "engine": args.engine,
+        "cache_dir": args.cache,
+        "out": args.out,
+        "plots": args.plots,
+    }
+    if args.threads > 1 and len(experiments) > 1:
+        with Pool(min(args.threads, len(experiments)), init_worker, (state,)) as pool:
+            rows = pool.map(run_experiment, experiments, chunksize=1)
+    else:
+        init_worker(state)
+        rows = [run_experiment(exp_path) for exp_path in experiments]
+
+    counts_path = os.path.join(args.out, f"{args.name}_batch_counts.csv")
+    pd.DataFrame(rows).to_csv(counts_path, index=False)
+
+    date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"Completed BindCompare batch! Time Stamp: {date}")
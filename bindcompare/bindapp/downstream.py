@@ -10,67 +10,51 @@
 
 import os
 import pandas as pd
-from Bio import SeqIO
 import sys
 import subprocess
+from .fasta import FastaIndex
 
 
 def get_chrom2seq(FASTA_FILE, capitalize=True):
     """
-    Load in the genome fasta file to extract sequences from the BED Files.
+    Open the genome fasta file to extract sequences from the BED Files.
+    Sequences are read on demand through the file's .fai index.
     """
-    chrom2seq = {}
-    for seq in SeqIO.parse(FASTA_FILE, "fasta"):
-        description = seq.description.split()[0]
-        if description.startswith("chr"):
-            key = description[3:]  # Remove the 'chr' prefix
-        else:
-            key = description
-        chrom2seq[key] = seq.seq.upper() if capitalize else seq.seq
-    return chrom2seq
+    return FastaIndex(FASTA_FILE, capitalize)
 
 
-def downstream(input_genes: str, fasta: str, outdir: str):
+def downstream(
+    input_genes: str,
+    fasta: str,
+    outdir: str,
+    chrom2seq: FastaIndex = None,
+    table: pd.DataFrame = None,
+):
+    """Adds the reference site sequences to the overlaps CSV and writes them to
+    sequences.fasta. The overlap table is taken from memory when given."""
     if fasta == "None":
         os.write(1, b"Skipping Sequence Extraction...\n")
     else:
         os.write(1, b"Completed BED Merge... starting sequence extraction!\n")
-        df = pd.read_csv(input_genes)
-        bed = df[["Chrom", "Begin Ref Site", "End Ref Site"]]
+        df = pd.read_csv(input_genes) if table is None else table.copy()
 
-        chrom2seq = get_chrom2seq(fasta)
+        if chrom2seq is None:
+            chrom2seq = get_chrom2seq(fasta)
 
-        # try:
-        df["Sequences"] = df.apply(
-            lambda row: str(
-                chrom2seq[row.Chrom][row["Begin Ref Site"] : row["End Ref Site"]]
-            ),
-            axis=1,
-        )
-        df.to_csv(input_genes)
+        chroms = df["Chrom"].tolist()
+        begins = df["Begin Ref Site"].tolist()
+        ends = df["End Ref Site"].tolist()
+        sequences = chrom2seq.fetch_many(chroms, begins, ends)
+        df["Sequences"] = sequences
+        df.to_csv(input_genes, index=False)
 
-        fastapath = outdir + "/sequences.fasta"
         # Create the FASTA file of extracted sequences
-        fp = open(fastapath, "w")
-        for _, row in df.iterrows():
-            chrom_pos = (
-                row["Chrom"]
-                + ":"
-                + str(row["Begin Ref Site"])
-                + "-"
-                + str(row["End Ref Site"])
-            )
-            name = (
-                ">"
-                + row["GeneIDs"].replace('"', "").replace(";", "")
-                + "; "
-                + chrom_pos
-                + "\n"
-            )
-            fp.write(name)
-            sequence = row["Sequences"] + "\n"
-            fp.write(sequence)
-        fp.close()
+        names = [f"{c}:{b}-{e}" for c, b, e in zip(chroms, begins, ends)]
+        if "GeneIDs" in df:
+            names = [f"{g}; {n}" for g, n in zip(df["GeneIDs"].tolist(), names)]
+        fastapath = outdir + "/sequences.fasta"
+        with open(fastapath, "w", buffering=1 << 20) as fp:
+            fp.writelines(f">{n}\n{s}\n" for n, s in zip(names, sequences))
         # except Exception as e:
         #     print(
         #         "Error in extracting sequences: unable to continue sequence translation. Ensure that you have the correct FASTA file."
@@ -1,10 +1,16 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-from intervaltree import Interval, IntervalTree
 import pandas as pd
 from .merge_class import Bed, GTF
+from .options import ENGINES
+from .utils import expand_ranges
 import os
+from multiprocessing import Pool, current_process
+from typing import TYPE_CHECKING
+
+# matplotlib (via .plots) and intervaltree are imported where they are used, so
+# runs that skip plotting or use the numpy engine never load them.
+if TYPE_CHECKING:
+    from intervaltree import IntervalTree
 
 import time
 
@@ -26,59 +32,120 @@ def moving_average(data, window_size):
     return smoothed_data
 
 
+CATEGORIES = ["CRO", "ORE", "ORF", "PXP"]
+
+# One record per overlap. chrom is the index into the ref BED's chromosome list
+# and category the index into CATEGORIES.
+OVERLAP_DTYPE = np.dtype(
+    [
+        ("chrom", np.int32),
+        ("ref_start", np.int64),
+        ("ref_end", np.int64),
+        ("exp_start", np.int64),
+        ("exp_end", np.int64),
+        ("category", np.int8),
+    ]
+)
+
+
+def offset_profile(lower: np.ndarray, upper: np.ndarray, scope: int):
+    """Counts how many [lower, upper] offset ranges cover each position in [-scope, scope].
+    Uses a difference array, so the cost does not depend on the range widths."""
+    size = 2 * scope + 2
+    diff = np.bincount(lower + scope, minlength=size)
+    diff -= np.bincount(upper + scope + 1, minlength=size)
+    return np.cumsum(diff)[:-1]
+
+
+def peak_profile(starts: np.ndarray, ends: np.ndarray, scope: int):
+    """Counts how many peaks, centered on their midpoint, cover each position in
+    [-scope, scope]. Peaks wider than 2 * scope are clipped to the window."""
+    widths = ends - starts
+    lower = np.maximum(-((widths + 1) // 2), -scope)
+    upper = np.minimum(widths // 2 - 1, scope)
+    valid = lower <= upper
+    return offset_profile(lower[valid], upper[valid], scope)
+
+
+def concatenate_masks(masks: list):
+    """Joins per-chromosome peak masks into one mask over all peaks."""
+    return np.concatenate(masks) if masks else np.zeros(0, dtype=bool)
+
+
 class Chromosome:
     def __init__(
         self,
         name: str,
         scope: int,
-        ref_it: IntervalTree,
-        exp_it: IntervalTree,
+        ref_it: "IntervalTree" = None,
+        exp_it: "IntervalTree" = None,
+        ref_loci: np.ndarray = None,
+        exp_loci: np.ndarray = None,
+        chrom_id: int = 0,
     ):
         self.chr = name
+        self.chrom_id = chrom_id
         self.ref_binds_it = ref_it
         self.exp_binds_it = exp_it
         self.scope = scope
 
+        # (start, end) arrays of the peaks. Peaks are identified by their index
+        # here, which is also the data stored in the interval trees.
+        self.ref_loci = ref_loci
+        self.exp_loci = exp_loci
+        self.num_ref_peaks = len(ref_loci)
+
         self.overlap_counts_it = {"Total": 0, "CRO": 0, "ORE": 0, "ORF": 0, "PXP": 0}
-        self.overlaps_it = []
-        self.overlap_full_it = []
-        self.overlap_front_it = []
-        self.overlap_end_it = []
-        self.overlap_ext_it = []
+        self.overlaps_it = np.empty(0, dtype=OVERLAP_DTYPE)
+        # Offset profiles: counts of overlaps covering each position in [-scope, scope].
+        self.overlap_full_it = np.zeros(2 * scope + 1, dtype=np.int64)
+        self.overlap_front_it = np.zeros(2 * scope + 1, dtype=np.int64)
+        self.overlap_end_it = np.zeros(2 * scope + 1, dtype=np.int64)
+        self.overlap_ext_it = np.zeros(2 * scope + 1, dtype=np.int64)
         self.gene_ids_it = set()
 
-        self.unique_ref_overlaps_it = set()
-        self.unique_ola_overlaps_it = set()
+        # Per-peak masks of the ref/exp peaks involved in an overlap or proximal peak.
+        self.unique_ref_overlaps_it = np.zeros(len(ref_loci), dtype=bool)
+        self.unique_ola_overlaps_it = np.zeros(len(exp_loci), dtype=bool)
 
-        self.unique_ref_proxpeak_it = set()
-        self.unique_exp_proxpeak_it = set()
+        self.unique_ref_proxpeak_it = np.zeros(len(ref_loci), dtype=bool)
+        self.unique_exp_proxpeak_it = np.zeros(len(exp_loci), dtype=bool)
+
+        # Candidate (ref, exp) index pairs found by the numpy engine.
+        self.pairs = None
 
     def within(self, exp_bind: tuple, ref_bind: tuple):
-        """Returns the overlap between exp_bind and ref_bind."""
+        """Returns the bounds of the overlap between exp_bind and the scoped ref_bind,
+        as offsets from the ref midpoint. Both are None if there is no overlap."""
         midpoint = (int)((int(ref_bind[0]) + int(ref_bind[1])) / 2)
         # Create the scope.
-        overlap = range(
-            max(int(exp_bind[0]), midpoint - self.scope),
-            min(int(exp_bind[1]), midpoint + self.scope) + 1,
-        )
-        if len(overlap) == 0:
-            return overlap, None, None
+        lower = max(int(exp_bind[0]), midpoint - self.scope)
+        upper = min(int(exp_bind[1]), midpoint + self.scope)
+        if upper < lower:
+            return None, None
         else:
             # Adjust to -1000 to 1000 base pair range.
-            lower = overlap[0]
-            upper = overlap[-1]
-            overlap = [x - midpoint for x in overlap]
-            return overlap, lower, upper
-
-    def coord_format(self, coord: tuple, chrom: str):
-        """Returns the coordinate in the format 'chr:start-end'."""
-        return f"{chrom}:{coord[0]}-{coord[1]}"
+            return lower - midpoint, upper - midpoint
+
+    def overlap_records(self, r_idx: np.ndarray, e_idx: np.ndarray, codes: np.ndarray):
+        """Returns the overlap records for the (ref, exp) index pairs and category codes."""
+        records = np.empty(len(r_idx), dtype=OVERLAP_DTYPE)
+        records["chrom"] = self.chrom_id
+        records["ref_start"] = self.ref_loci[r_idx, 0]
+        records["ref_end"] = self.ref_loci[r_idx, 1]
+        records["exp_start"] = self.exp_loci[e_idx, 0]
+        records["exp_end"] = self.exp_loci[e_idx, 1]
+        records["category"] = codes
+        return records
 
     def compare_chrom_bind_it(self):
         """Compares the binding sites for the given chromosome."""
         # Make all the Binding Comparisons
-        for exp_bind in self.exp_binds_it:
-            e_beg, e_end, e_bind = exp_bind
+        diffs = {ot: np.zeros(2 * self.scope + 2, dtype=np.int64) for ot in CATEGORIES}
+        pairs = []
+        for exp_interval in self.exp_binds_it:
+            e_beg, e_end, e_idx = exp_interval
+            exp_bind = (e_beg, e_end)
             overlaps = self.ref_binds_it[e_beg:e_end]
             # overlap, upper, lower = self.within(exp_bind, ref_bind)
             if len(overlaps) == 0:
@@ -86,44 +153,111 @@ class Chromosome:
                 continue
             else:
                 for r_interval in overlaps:
-                    r_beg, r_end, ref_bind = r_interval
-                    overlap, upper, lower = self.within((e_beg, e_end), ref_bind)
+                    r_beg, r_end, r_idx = r_interval
+                    ref_bind = self.ref_loci[r_idx].tolist()
+                    lower, upper = self.within((e_beg, e_end), ref_bind)
                     if (exp_bind[0] >= ref_bind[0] and exp_bind[1] <= ref_bind[1]) or (
                         exp_bind[0] <= ref_bind[0] and exp_bind[1] >= ref_bind[1]
                     ):
                         # The EXP peak is fully contained by the REF peak
-                        self.overlap_full_it.extend(overlap)
                         ot = "CRO"
                     elif exp_bind[1] > ref_bind[1] and exp_bind[0] <= ref_bind[1]:
                         # The EXP Peak overlaps the end of the REF peak.
-                        self.overlap_end_it.extend(overlap)
                         ot = "ORE"
                     elif exp_bind[0] < ref_bind[0] and exp_bind[1] >= ref_bind[0]:
                         # The EXP Peak overlaps the front of the REF peak.
-                        self.overlap_front_it.extend(overlap)
                         ot = "ORF"
                     else:
                         # The EXP Peak overlaps the REF peak externally.
-                        self.overlap_ext_it.extend(overlap)
                         ot = "PXP"
 
+                    diffs[ot][lower + self.scope] += 1
+                    diffs[ot][upper + self.scope + 1] -= 1
                     if ot == "PXP":
-                        self.unique_ref_proxpeak_it.add(ref_bind)
-                        self.unique_exp_proxpeak_it.add(exp_bind)
+                        self.unique_ref_proxpeak_it[r_idx] = True
+                        self.unique_exp_proxpeak_it[e_idx] = True
                     else:
-                        self.unique_ref_overlaps_it.add(ref_bind)
-                        self.unique_ola_overlaps_it.add(exp_bind)
+                        self.unique_ref_overlaps_it[r_idx] = True
+                        self.unique_ola_overlaps_it[e_idx] = True
                     self.overlap_counts_it["Total"] += 1
                     self.overlap_counts_it[ot] += 1
-                    self.overlaps_it.append(
-                        (
-                            self.chr,
-                            ref_bind[0],
-                            ref_bind[1],
-                            self.coord_format(exp_bind, self.chr),
-                            ot,
-                        )
-                    )
+                    pairs.append((r_idx, e_idx, CATEGORIES.index(ot)))
+        self.overlap_full_it += np.cumsum(diffs["CRO"])[:-1]
+        self.overlap_end_it += np.cumsum(diffs["ORE"])[:-1]
+        self.overlap_front_it += np.cumsum(diffs["ORF"])[:-1]
+        self.overlap_ext_it += np.cumsum(diffs["PXP"])[:-1]
+        r_idx, e_idx, codes = np.array(pairs, dtype=np.int64).reshape(-1, 3).T
+        self.overlaps_it = self.overlap_records(r_idx, e_idx, codes)
+
+    def compare_chrom_bind_np(self):
+        """Compares the binding sites for the given chromosome with sorted arrays.
+        Produces the same overlaps and counts as compare_chrom_bind_it."""
+        r_beg, r_end = self.ref_loci[:, 0], self.ref_loci[:, 1]
+        e_beg, e_end = self.exp_loci[:, 0], self.exp_loci[:, 1]
+        midpoints = (r_beg + r_end) // 2
+        order = np.argsort(midpoints, kind="stable")
+        sorted_mids = midpoints[order]
+
+        # A ref peak is a candidate when [mid - scope, mid + scope] meets [e_beg, e_end).
+        lo = np.searchsorted(sorted_mids, e_beg - self.scope, side="left")
+        hi = np.searchsorted(sorted_mids, e_end - 1 + self.scope, side="right")
+        flat, e_idx = expand_ranges(lo, hi)
+        self.record_pairs(order[flat], e_idx)
+
+    def record_pairs(self, r_idx: np.ndarray, e_idx: np.ndarray):
+        """Classifies and records the candidate (ref, exp) pairs given as indices
+        into ref_loci and exp_loci."""
+        self.pairs = (r_idx, e_idx)
+        r0, r1 = self.ref_loci[r_idx, 0], self.ref_loci[r_idx, 1]
+        e0, e1 = self.exp_loci[e_idx, 0], self.exp_loci[e_idx, 1]
+        mid = (r0 + r1) // 2
+
+        cro = ((e0 >= r0) & (e1 <= r1)) | ((e0 <= r0) & (e1 >= r1))
+        ore = ~cro & (e1 > r1) & (e0 <= r1)
+        orf = ~cro & ~ore & (e0 < r0) & (e1 >= r0)
+        pxp = ~(cro | ore | orf)
+        codes = np.select([cro, ore, orf], [0, 1, 2], 3)
+
+        # Offsets of each overlap relative to the ref midpoint, as in within().
+        lower = np.maximum(e0, mid - self.scope) - mid
+        upper = np.minimum(e1, mid + self.scope) - mid
+        for mask, profile in [
+            (cro, self.overlap_full_it),
+            (ore, self.overlap_end_it),
+            (orf, self.overlap_front_it),
+            (pxp, self.overlap_ext_it),
+        ]:
+            profile += offset_profile(lower[mask], upper[mask], self.scope)
+
+        self.unique_ref_proxpeak_it[r_idx[pxp]] = True
+        self.unique_exp_proxpeak_it[e_idx[pxp]] = True
+        self.unique_ref_overlaps_it[r_idx[~pxp]] = True
+        self.unique_ola_overlaps_it[e_idx[~pxp]] = True
+
+        self.overlap_counts_it["Total"] += len(r_idx)
+        for ot, mask in [("CRO", cro), ("ORE", ore), ("ORF", orf), ("PXP", pxp)]:
+            self.overlap_counts_it[ot] += int(np.count_nonzero(mask))
+        self.overlaps_it = self.overlap_records(r_idx, e_idx, codes)
+
+    def at_scope(self, scope: int):
+        """Returns a compared Chromosome for a smaller scope, derived from the
+        candidate pairs of this one instead of searching again."""
+        if scope > self.scope:
+            raise ValueError(f"Cannot derive scope {scope} from scope {self.scope}.")
+        chrom = Chromosome(
+            self.chr,
+            scope,
+            ref_loci=self.ref_loci,
+            exp_loci=self.exp_loci,
+            chrom_id=self.chrom_id,
+        )
+        r_idx, e_idx = self.pairs
+        mid = self.ref_loci[r_idx].sum(axis=1) // 2
+        keep = (mid - scope < self.exp_loci[e_idx, 1]) & (
+            mid + scope >= self.exp_loci[e_idx, 0]
+        )
+        chrom.record_pairs(r_idx[keep], e_idx[keep])
+        return chrom
 
     def get_num_overlaps(self):
         """Returns the number of overlaps."""
@@ -140,30 +274,113 @@ class Chromosome:
         )
 
 
+def compare_chromosome(chrom: Chromosome):
+    """Runs the comparison for one chromosome. Used as the process-pool task."""
+    if chrom.ref_binds_it is None:
+        chrom.compare_chrom_bind_np()
+    else:
+        chrom.compare_chrom_bind_it()
+    return chrom
+
+
 class BindCompare:
-    def __init__(self, ref_bed: Bed, exp_bed: Bed, scope: int):
+    def __init__(
+        self,
+        ref_bed: Bed,
+        exp_bed: Bed,
+        scope: int,
+        engine: str = "numpy",
+        threads: int = 1,
+    ):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine}. Choose from {ENGINES}.")
         self.ref_bed = ref_bed
         self.exp_bed = exp_bed
         self.scope = scope
+        self.engine = engine
+        self.threads = threads
         self.experiments = {}
         self.font = {"fontname": "Sans Serif"}
+        # Per-chromosome reference peak profiles, built on first use.
+        self.ref_profiles = None
 
     def compare_binds(self):
         """Compares the binding sites for each chromosome."""
         # Make all the Binding Comparisons
-        for chromosome in self.ref_bed.get_chroms():
+        chroms = []
+        for chrom_id, chromosome in enumerate(self.ref_bed.get_chroms()):
             if chromosome not in self.exp_bed.get_chroms():
                 continue
-            self.experiments[chromosome] = Chromosome(
-                chromosome,
-                self.scope,
-                self.ref_bed.get_chrom_it(chromosome),
-                self.exp_bed.get_chrom_it(chromosome),
-            )
-            # begin = time.time()
-            self.experiments[chromosome].compare_chrom_bind_it()
-            # end = time.time()
-            # print("interval-tree took {}".format(end - begin))
+            ref_loci = self.ref_bed.get_chrom_array(chromosome)
+            exp_loci = self.exp_bed.get_chrom_array(chromosome)
+            if self.engine == "numpy":
+                chroms.append(
+                    Chromosome(
+                        chromosome,
+                        self.scope,
+                        ref_loci=ref_loci,
+                        exp_loci=exp_loci,
+                        chrom_id=chrom_id,
+                    )
+                )
+            else:
+                chroms.append(
+                    Chromosome(
+                        chromosome,
+                        self.scope,
+                        self.ref_bed.get_chrom_it(chromosome),
+                        self.exp_bed.get_chrom_it(chromosome),
+                        ref_loci,
+                        exp_loci,
+                        chrom_id,
+                    )
+                )
+
+        if self.threads > 1 and len(chroms) > 1:
+            # Chromosomes are independent; hand out the biggest ones first.
+            jobs = sorted(chroms, key=self.chrom_size, reverse=True)
+            with Pool(min(self.threads, len(jobs))) as pool:
+                done = {c.chr: c for c in pool.imap_unordered(compare_chromosome, jobs)}
+            chroms = [done[c.chr] for c in chroms]
+        else:
+            chroms = [compare_chromosome(c) for c in chroms]
+        self.experiments = {c.chr: c for c in chroms}
+
+    def chrom_size(self, chrom: Chromosome):
+        """Returns the number of ref and exp peaks on the chromosome."""
+        return len(self.ref_bed.get_chrom(chrom.chr)) + len(
+            self.exp_bed.get_chrom(chrom.chr)
+        )
+
+    def at_scope(self, scope: int):
+        """Returns a BindCompare for a smaller scope whose chromosomes are derived
+        from this comparison's candidate pairs. Only the numpy engine keeps them."""
+        if self.engine != "numpy":
+            raise ValueError("Deriving smaller scopes requires the numpy engine.")
+        derived = BindCompare(
+            self.ref_bed, self.exp_bed, scope, self.engine, self.threads
+        )
+        derived.experiments = {
+            name: chrom.at_scope(scope) for name, chrom in self.experiments.items()
+        }
+        return derived
+
+    def ref_peak_profile(self, chromosome: str = None):
+        """Returns the counts of reference peaks covering each offset from their
+        midpoint, for one chromosome or summed over all reference chromosomes."""
+        if self.ref_profiles is None:
+            self.ref_profiles = {}
+            for chrom in self.ref_bed.get_chroms():
+                loci = self.ref_bed.get_chrom_array(chrom)
+                self.ref_profiles[chrom] = peak_profile(
+                    loci[:, 0], loci[:, 1], self.scope
+                )
+        if chromosome is not None:
+            return self.ref_profiles[chromosome]
+        total = np.zeros(2 * self.scope + 1, dtype=np.int64)
+        for profile in self.ref_profiles.values():
+            total += profile
+        return total
 
     def get_experiment(self, chromosome: str):
         """Returns the experiment for the given chromosome."""
@@ -171,76 +388,73 @@ class BindCompare:
 
     def get_experiments_overlaps_it(self, chromosomes: list):
         """Returns the experiments for the given chromosomes."""
-        olaps = []
-        full_o = []
-        front_o = []
-        end_o = []
-        ext_o = []
+        olaps = [np.empty(0, dtype=OVERLAP_DTYPE)]
+        full_o = np.zeros(2 * self.scope + 1, dtype=np.int64)
+        front_o = np.zeros(2 * self.scope + 1, dtype=np.int64)
+        end_o = np.zeros(2 * self.scope + 1, dtype=np.int64)
+        ext_o = np.zeros(2 * self.scope + 1, dtype=np.int64)
         overlap_counts = {"Total": 0, "CRO": 0, "ORE": 0, "ORF": 0, "PXP": 0}
-        unique_ref_overlaps = set()
-        unique_ola_overlaps = set()
-        unique_ref_proxpeak = set()
-        unique_exp_proxpeak = set()
+        unique_ref_overlaps = []
+        unique_ola_overlaps = []
+        unique_ref_proxpeak = []
+        unique_exp_proxpeak = []
         for chromosome in chromosomes:
             if chromosome not in self.experiments:
                 continue
-            olaps.extend(self.experiments[chromosome].overlaps_it)
-            full_o.extend(self.experiments[chromosome].overlap_full_it)
-            front_o.extend(self.experiments[chromosome].overlap_front_it)
-            end_o.extend(self.experiments[chromosome].overlap_end_it)
-            ext_o.extend(self.experiments[chromosome].overlap_ext_it)
+            olaps.append(self.experiments[chromosome].overlaps_it)
+            full_o += self.experiments[chromosome].overlap_full_it
+            front_o += self.experiments[chromosome].overlap_front_it
+            end_o += self.experiments[chromosome].overlap_end_it
+            ext_o += self.experiments[chromosome].overlap_ext_it
             for key in self.experiments[chromosome].overlap_counts_it:
                 overlap_counts[key] += self.experiments[chromosome].overlap_counts_it[
                     key
                 ]
-            unique_ref_overlaps.update(
+            unique_ref_overlaps.append(
                 self.experiments[chromosome].unique_ref_overlaps_it
             )
-            unique_ola_overlaps.update(
+            unique_ola_overlaps.append(
                 self.experiments[chromosome].unique_ola_overlaps_it
             )
-            unique_ref_proxpeak.update(
+            unique_ref_proxpeak.append(
                 self.experiments[chromosome].unique_ref_proxpeak_it
             )
-            unique_exp_proxpeak.update(
+            unique_exp_proxpeak.append(
                 self.experiments[chromosome].unique_exp_proxpeak_it
             )
 
         return {
-            "overlaps": olaps,
-            "full": np.asarray(full_o),
-            "front": np.asarray(front_o),
-            "end": np.asarray(end_o),
-            "ext": np.asarray(ext_o),
+            "overlaps": np.concatenate(olaps),
+            "chroms": list(self.ref_bed.get_chroms()),
+            "full": full_o,
+            "front": front_o,
+            "end": end_o,
+            "ext": ext_o,
             "overlap_counts": overlap_counts,
-            "unique_ref_overlaps": unique_ref_overlaps,
-            "unique_ola_overlaps": unique_ola_overlaps,
-            "unique_ref_proxpeak": unique_ref_proxpeak,
-            "unique_exp_proxpeak": unique_exp_proxpeak,
+            # Peak masks, concatenated over the chromosomes in the same order.
+            "unique_ref_overlaps": concatenate_masks(unique_ref_overlaps),
+            "unique_ola_overlaps": concatenate_masks(unique_ola_overlaps),
+            "unique_ref_proxpeak": concatenate_masks(unique_ref_proxpeak),
+            "unique_exp_proxpeak": concatenate_masks(unique_exp_proxpeak),
         }
 
     def scatter_overlap_freq(self, bc_dict: dict, filepath: str):
+        import matplotlib.pyplot as plt
+        from .plots import profile_points
+
         fig = plt.figure()
         ax1 = fig.add_subplot(111)
 
-        x, y = np.unique(
-            bc_dict["full"], return_counts=True
-        )  # counting occurrence of each loan
+        x, y = profile_points(bc_dict["full"], self.scope)
         ax1.scatter(x, y, s=10, c="m", marker="s", label="Complete Peak Overlap (CRO)")
 
-        x, y = np.unique(
-            bc_dict["front"], return_counts=True
-        )  # counting occurrence of each loan
+        x, y = profile_points(bc_dict["front"], self.scope)
         ax1.scatter(x, y, s=5, c="r", marker="o", label="Overlap Ref Front (ORF)")
 
-        x, y = np.unique(
-            bc_dict["end"], return_counts=True
-        )  # counting occurrence of each loan
+        x, y = profile_points(bc_dict["end"], self.scope)
         ax1.scatter(x, y, s=5, c="b", marker="o", label="Overlaps Ref End (ORE)")
 
-        x, y = np.unique(
-            bc_dict["ext"], return_counts=True
-        )  # counting occurrence of each loan
+        x, y = profile_points(bc_dict["ext"], self.scope)
         ax1.scatter(x, y, s=5, c="y", marker="o", label="Proximal Peaks (PXP)")
 
         ax1.set_xlabel("Overlap of Binding Sites", **self.font)
@@ -256,390 +470,165 @@ class BindCompare:
 
     def overlap_distribution_barplot(self, bc_dict: dict, filepath: str):
         """Takes the overlap counts and generates a single bar split by overlap category."""
-        # Sample data generation
-        overlap_types = [
-            "Full Overlap (CRO)",
-            "Front Overlap (ORF)",
-            "End Overlap (ORE)",
-            "Proximal Peak (PXP)",
-        ]
-        counts = bc_dict["overlap_counts"]
-        values = [counts["CRO"], counts["ORF"], counts["ORE"], counts["PXP"]]
-        total = sum(values)
+        from . import plots
 
-        if total == 0:
-            print("Overlap Distribution Plot Terminated... no counts found.")
-            return
-
-        values = [val / total for val in values]
-
-        # Your code for plotting
-        fig, ax = plt.subplots(figsize=(10, 2))
-
-        left = 0
-        colors = ["purple", "red", "blue", "yellow"]
-        for i, value in enumerate(values):
-            ax.barh(
-                0,
-                value,
-                left=left,
-                label=overlap_types[i],
-                edgecolor="black",
-                linewidth=1,
-                color=colors[i],
-            )
-            left += value
-
-        ax.set_xlim(0, 1)
-        ax.set_ylim(-0.5, 0.5)
-        ax.set_xlabel("Distribution of Overlap Type Frequencies")
-
-        # Hide y-axis labels
-        ax.get_yaxis().set_visible(False)
-
-        # Set a title
-        ax.set_title("Stacked Bar Plot of Overlap Categories")
-
-        # Add a custom legend item for the total without a color
-        legend_total = mpatches.Patch(label=f"Total: {total:.0f}", color="none")
-        handles, labels = ax.get_legend_handles_labels()
-        handles.append(legend_total)
-
-        # Create the legend
-        ax.legend(handles=handles, loc="center left", bbox_to_anchor=(1, 0.5))
-
-        plt.subplots_adjust(
-            left=0.05, right=0.85, top=0.9, bottom=0.1
-        )  # Adjust the layout
-
-        plt.savefig(filepath + "_bardist.png", bbox_inches="tight", dpi=300)
-        plt.close()
+        plots.overlap_distribution_barplot(self.plot_data(bc_dict), filepath)
 
     def overlap_distribution_piechart(self, bc_dict: dict, filepath: str):
         """Takes the overlap counts and generates a pie chart split by overlap category."""
-        categories = [
-            "Complete Overlap",
-            "Overlap Ref. Front",
-            "Overlap Ref. End",
-            "Proximal Peak",
-        ]
-
-        counts = [
-            bc_dict["overlap_counts"]["CRO"],
-            bc_dict["overlap_counts"]["ORF"],
-            bc_dict["overlap_counts"]["ORE"],
-            bc_dict["overlap_counts"]["PXP"],
-        ]
-        colors = ["purple", "red", "blue", "yellow"]
-        total = sum(counts)
-        fig1, ax1 = plt.subplots()
+        from . import plots
 
-        def pie_fmt(x):
-            return "{:.0f}".format((total) * x / 100)
-
-        ax1.pie(
-            counts, labels=categories, autopct=pie_fmt, startangle=90, colors=colors
-        )
-        ax1.axis("equal")
-
-        plt.title(f"Categorization of {total} Found Overlaps", **self.font)
-        plt.savefig(filepath + "_pie.png", dpi=300)
-        plt.close()
+        plots.overlap_distribution_piechart(self.plot_data(bc_dict), filepath)
 
     def overlap_bar_totals(self, bc_dict: dict, filepath: str):
-        categories = [
-            "Exp. Binding\nPeaks",
-            "Unique Overlaps",
-            "Total No.\nof Overlaps",
-            "Unique\nProx. Peaks",
-            "Total No. of\nProx. Peaks",
-            "Reference\nPeaks Identified",
+        from . import plots
+
+        plots.overlap_bar_totals(self.plot_data(bc_dict), filepath)
+
+    def overlap_table(self, bc_dict: dict):
+        """Returns one row per reference site, aggregating its overlaps by type.
+        Sorting the records once by (chrom, site, type, experimental peak) replaces
+        the two groupbys, and makes the output independent of the engine."""
+        records = bc_dict["overlaps"]
+        chrom_names = np.asarray(bc_dict["chroms"], dtype=object)
+        # Chromosomes are ordered by name, as the groupbys did.
+        chrom_rank = np.argsort(np.argsort(chrom_names.astype(str), kind="stable"))
+        order = np.lexsort(
+            (
+                records["exp_end"],
+                records["exp_start"],
+                records["category"],
+                records["ref_end"],
+                records["ref_start"],
+                chrom_rank[records["chrom"]],
+            )
+        )
+        records = records[order]
+        chroms = chrom_names[records["chrom"]]
+
+        # Coordinate strings are only produced here, when writing the output.
+        exp_peaks = [
+            f"{chrom}:{start}-{end}"
+            for chrom, start, end in zip(
+                chroms, records["exp_start"].tolist(), records["exp_end"].tolist()
+            )
         ]
 
-        overlap_total = (
-            bc_dict["overlap_counts"]["CRO"]
-            + bc_dict["overlap_counts"]["ORF"]
-            + bc_dict["overlap_counts"]["ORE"]
+        site = ["chrom", "ref_start", "ref_end"]
+        new_site = np.ones(len(records), dtype=bool)
+        new_site[1:] = np.logical_or.reduce(
+            [records[key][1:] != records[key][:-1] for key in site]
         )
-
-        complete = set()
-        complete.update(bc_dict["unique_ref_overlaps"])
-        complete.update(bc_dict["unique_ref_proxpeak"])
-
-        vals = [
-            self.exp_bed.num_peaks,
-            len(bc_dict["unique_ola_overlaps"]),
-            overlap_total,
-            len(bc_dict["unique_exp_proxpeak"]),
-            bc_dict["overlap_counts"]["PXP"],
-            len(complete),
-        ]
-        bars = plt.bar(
-            categories,
-            vals,
-            color=[
-                "steelblue",
-                "sandybrown",
-                "lightgrey",
-                "peru",
-                "slategrey",
-                "cornflowerblue",
-            ],
+        new_type = new_site.copy()
+        new_type[1:] |= records["category"][1:] != records["category"][:-1]
+
+        # Runs of records with the same site and type, and runs of those per site.
+        type_bounds = np.append(np.flatnonzero(new_type), len(records))
+        type_starts, type_ends = type_bounds[:-1].tolist(), type_bounds[1:].tolist()
+        site_bounds = np.append(
+            np.flatnonzero(new_site[type_bounds[:-1]]), len(type_starts)
+        )
+        type_peaks = [",".join(exp_peaks[a:b]) for a, b in zip(type_starts, type_ends)]
+        type_names = [CATEGORIES[code] for code in records["category"][type_starts]]
+        type_counts = [str(b - a) for a, b in zip(type_starts, type_ends)]
+
+        site_rows = type_bounds[:-1][site_bounds[:-1]]
+        site_slices = list(zip(site_bounds[:-1].tolist(), site_bounds[1:].tolist()))
+        return pd.DataFrame(
+            {
+                "Chrom": chroms[site_rows],
+                "Begin Ref Site": records["ref_start"][site_rows],
+                "End Ref Site": records["ref_end"][site_rows],
+                # String columns keep their dtype when no site has an overlap.
+                "Overlay_Type": pd.Series(
+                    [",".join(type_names[a:b]) for a, b in site_slices], dtype=str
+                ),
+                "Occurrences": pd.Series(
+                    [",".join(type_counts[a:b]) for a, b in site_slices], dtype=str
+                ),
+                "Experimental_Peaks": pd.Series(
+                    ["".join(type_peaks[a:b]) for a, b in site_slices], dtype=str
+                ),
+            }
         )
-
-        for bar in bars:
-            yval = bar.get_height()
-            plt.text(bar.get_x() + 0.25, yval + 0.35, yval, wrap=True)
-
-        plt.xticks(fontsize=7)
-
-        plt.ylabel("")
-        plt.xlabel("")
-        plt.title("Total Number of Overlaps and Binding Peaks in Overlayed Bed")
-        plt.savefig(filepath + "_barsummary.png", dpi=300)
-        plt.close()
 
     def generate_csv(
         self, bc_dict: dict, filepath: str, outdir: str, name: str, gtf: GTF = None
     ):
-        df = pd.DataFrame(
-            bc_dict["overlaps"],
-            columns=[
-                "Chrom",
-                "Begin Ref Site",
-                "End Ref Site",
-                "Experimental_Peaks",
-                "Overlay_Type",
-            ],
-        )
-
-        group_columns = ["Chrom", "Begin Ref Site", "End Ref Site", "Overlay_Type"]
-        df = df.groupby(group_columns, as_index=False).agg(
-            Experimental_Peaks=("Experimental_Peaks", ",".join),
-            Occurrences=("Overlay_Type", "count"),
-        )
-
-        df["Occurrences"] = df["Occurrences"].apply(lambda x: str(x) + ",")
-        df["Overlay_Type"] = df["Overlay_Type"].apply(lambda x: str(x) + ",")
-        columns = [
-            "Chrom",
-            "Begin Ref Site",
-            "End Ref Site",
-            "Experimental_Peaks",
-            "Overlay_Type",
-            "Occurrences",
-        ]
-        df = (
-            df.groupby(["Chrom", "Begin Ref Site", "End Ref Site"])
-            .agg(
-                Overlay_Type=("Overlay_Type", "sum"),
-                Occurrences=("Occurrences", "sum"),
-                Experimental_Peaks=("Experimental_Peaks", "sum"),
-            )
-            .reset_index()
-        )
-
-        df["Occurrences"] = df["Occurrences"].apply(lambda x: x[:-1])
-        df["Overlay_Type"] = df["Overlay_Type"].apply(lambda x: x[:-1])
+        df = self.overlap_table(bc_dict)
         if gtf is not None:
-            all_genes = set()
-            df["GeneIDs"] = df.apply(
-                lambda row: gtf.find_fbgn(
-                    row["Chrom"],
-                    row["Begin Ref Site"],
-                    row["End Ref Site"],
-                    self.scope,
-                    all_genes,
-                ),
-                axis=1,
+            labels, all_genes = gtf.annotate(
+                df["Chrom"].to_numpy(),
+                df["Begin Ref Site"].to_numpy(),
+                df["End Ref Site"].to_numpy(),
+                self.scope,
             )
+            df["GeneIDs"] = labels
             bc_dict["all_genes"] = all_genes
-            gene_arr = np.array(list(all_genes))
-            gdf = pd.DataFrame(gene_arr.reshape(len(gene_arr), -1), columns=["Gene ID"])
+            gdf = pd.DataFrame({"Gene ID": all_genes})
             outpath = "/tmp/gene_list.csv"
             gdf.to_csv(outpath, index=False)
         df.to_csv(filepath + "_overlaps.csv", index=False)
+        # Kept for the downstream sequence export, which then needs no re-read.
+        bc_dict["overlap_table"] = df
 
         ## Create Separate CSVs for Each Overlap Type
         path = os.path.join(outdir, "CategorizedCSVs")
         os.makedirs(path, exist_ok=True)
         for type_o in ["CRO", "ORF", "ORE", "PXP"]:
-            result = df[df["Overlay_Type"].apply(lambda x: type_o in x)]
+            result = df[df["Overlay_Type"].str.contains(type_o, regex=False)]
             path2 = os.path.join(path, type_o + f"_{name}_overlaps.csv")
             result.to_csv(path2, index=False)
 
     def plot_perchrom_ref_peak(self, filepath: str):
-        """The same plot as plot_average_ref_peak but creates N subplots for each chromosome on one panel.
-        There will be at most 3 plots on each row and there will be however many rows needed to fit all the chromosomes.
-        """
-        # Determine Number of Chromosomes
-        chroms = sorted(
-            list(self.experiments.keys()),
-            key=lambda x: (x.isdigit(), int(x) if x.isdigit() else x),
-        )
-        Nchroms = len(chroms)
-
-        num_rows = Nchroms // 3
-        num_rows = num_rows if num_rows * 3 == Nchroms else num_rows + 1
-        fig, axs = plt.subplots(
-            num_rows, 3, sharex=True, sharey="all", figsize=(13, Nchroms // 2 + 3)
-        )
-        if Nchroms == 1:
-            axs = [axs]
-        else:
-            axs = axs.flatten()
-
-        for i in range(Nchroms):
-            chrom, ax = chroms[i], axs[i]
-            chrom_t: Chromosome = self.experiments[chrom]
-            # num_peaks = len(chrom_t.ref_binds)
-            num_peaks = len(chrom_t.ref_binds_it)
-            x = np.arange(-self.scope, self.scope + 1, 1)
-            y = np.zeros(2 * self.scope + 1)
-
-            chrom_dict = self.ref_bed.get_loci([chrom])
-            for binding_site in chrom_dict[chrom]:
-                midpoint = (binding_site[1] + binding_site[0]) / 2
-                start_index = int(binding_site[0] - midpoint + self.scope)
-                end_index = int(binding_site[1] - midpoint + self.scope)
-                y[start_index:end_index] += 1
-            y = y / num_peaks
-            ax.plot(x, y, label="Average Ref. Peak", c="k", alpha=0.7)
-            ax2 = ax.twinx()
-
-            data_arrays = [
-                chrom_t.overlap_full_it,
-                chrom_t.overlap_front_it,
-                chrom_t.overlap_end_it,
-                chrom_t.overlap_ext_it,
-            ]
-            colors = ["m", "r", "b", "y"]
-
-            for arr, color in zip(data_arrays, colors):
-                x, z = np.unique(arr, return_counts=True)
-                # if len(arr) != 0:
-                # z = moving_average(z, 20)
-                ax2.plot(x, z, c=color, alpha=0.7)
-
-            ax.set_title(f"Chromosome {chrom}")
-
-        # Create a custom legend outside the function
-        custom_legend = [
-            plt.Line2D([0], [0], color="k", lw=2, label="Average Ref. Peak"),
-            plt.Line2D([0], [0], color="m", lw=2, label="CRO"),
-            plt.Line2D([0], [0], color="r", lw=2, label="ORF"),
-            plt.Line2D([0], [0], color="b", lw=2, label="ORE"),
-            plt.Line2D([0], [0], color="y", lw=2, label="PXP"),
-        ]
-        fig.legend(
-            handles=custom_legend,
-            loc="lower center",
-            fancybox=True,
-            shadow=True,
-            fontsize=11,
-            ncol=5,
-        ).set_bbox_to_anchor((0.5, 0.0))
-        # Set x-axis label at the center of the left
-        fig.text(
-            0.5,
-            0.07,
-            "Distance from Reference Peak Midpoint",
-            ha="center",
-            va="center",
-            fontsize=12,
-        )
+        """The same plot as plot_average_ref_peak but creates N subplots for each chromosome on one panel."""
+        from . import plots
 
-        # Set y-axis label at the center of the bottom
-        fig.text(
-            0.02,
-            0.5,
-            "Frequency of Reference Peaks",
-            ha="center",
-            va="center",
-            rotation="vertical",
-            fontsize=12,
-        )
-
-        fig.text(
-            0.98,
-            0.5,
-            "Overlaps Counts",
-            ha="center",
-            va="center",
-            rotation="vertical",
-            fontsize=12,
-        )
-
-        # plt.subplots_adjust(bottom=0.4)
-        fig.suptitle(
-            "Per Chromosome Counts of Binding Overlaps Across Reference Binding Peak",
-        )
-        fig.tight_layout()
-        fig.subplots_adjust(left=0.08, right=0.92, top=0.9, bottom=0.12)
-        plt.savefig(filepath + "_chrom_ref_freq.png", dpi=300)
-        plt.close()
+        plots.plot_perchrom_ref_peak(self.plot_data(), filepath)
 
     def plot_average_ref_peak(self, bc_dict: dict, filepath: str):
-        """With the x-axis being -scope to scope, plot all the frequency of the reference peaks over this domain.
-        normalize the y-axis and make the plot a line curve."""
-
-        num_peaks = self.ref_bed.num_peaks
-        x = np.arange(-self.scope, self.scope + 1, 1)
-        y = np.zeros(2 * self.scope + 1)
-        chrom_dict = self.ref_bed.get_loci(self.ref_bed.get_chroms())
-        for chr in chrom_dict:
-            for binding_site in chrom_dict[chr]:
-                midpoint = (binding_site[1] + binding_site[0]) / 2
-                start_index = int(binding_site[0] - midpoint + self.scope)
-                end_index = int(binding_site[1] - midpoint + self.scope)
-                y[start_index:end_index] += 1
-        y = y / num_peaks
-        fig = plt.figure()
-        ax1 = fig.add_subplot(111)
-        ln1 = ax1.plot(x, y, label="Average Ref. Peak", c="k", alpha=0.7)
-
-        ax2 = ax1.twinx()
-        x, z = np.unique(bc_dict["full"], return_counts=True)
-        # if len(z) != 0:
-        #     z = moving_average(z, 20)
-        ln2 = ax2.plot(x, z, c="m", label="Complete Ref Overlap (CRO)", alpha=0.7)
-
-        x, z = np.unique(bc_dict["front"], return_counts=True)
-        # if len(z) != 0:
-        #     z = moving_average(z, 20)
-        ln3 = ax2.plot(x, z, c="r", label="Overlap Ref Front (ORF)", alpha=0.7)
-
-        x, z = np.unique(bc_dict["end"], return_counts=True)
-        # if len(z) != 0:
-        #     z = moving_average(z, 20)
-        ln4 = ax2.plot(x, z, c="b", label="Overlaps Ref End (ORE)", alpha=0.7)
-
-        x, z = np.unique(bc_dict["ext"], return_counts=True)
-        # if len(z) != 0:
-        #     z = moving_average(z, 20)
-        ln5 = ax2.plot(x, z, c="y", label="Proximal Peaks (PXP)", alpha=0.7)
-
-        lns = ln1 + ln2 + ln3 + ln4 + ln5
-        labs = [l.get_label() for l in lns]
-
-        plt.title("Counts of Binding Overlaps Over Average Reference Peak Profile")
-        plt.xlabel("Distance from Reference Peak Midpoint")
-        ax1.set_ylabel("Frequency of Reference Peaks")
-        ax2.set_ylabel("Overlaps Counts")
-
-        plt.legend(
-            lns,
-            labs,
-            loc="upper center",
-            bbox_to_anchor=(0.5, -0.1),
-            fancybox=True,
-            shadow=True,
-            fontsize=8,
-            ncol=3,
-        )
-        plt.tight_layout()
-        plt.savefig(filepath + "_ref_freq.png", dpi=300)
-        plt.close()
+        """With the x-axis being -scope to scope, plot all the frequency of the reference peaks over this domain."""
+        from . import plots
+
+        plots.plot_average_ref_peak(self.plot_data(bc_dict), filepath)
+
+    def plot_data(self, bc_dict: dict = None):
+        """Collects the small aggregated inputs of the plots: counts and profiles.
+        This is all that is sent to the plot workers."""
+        data = {
+            "scope": self.scope,
+            "num_ref_peaks": self.ref_bed.num_peaks,
+            "num_exp_peaks": self.exp_bed.num_peaks,
+            "ref": self.ref_peak_profile(),
+            "chroms": {
+                name: {
+                    "num_ref_peaks": chrom.num_ref_peaks,
+                    "ref": self.ref_peak_profile(name),
+                    "full": chrom.overlap_full_it,
+                    "front": chrom.overlap_front_it,
+                    "end": chrom.overlap_end_it,
+                    "ext": chrom.overlap_ext_it,
+                }
+                for name, chrom in self.experiments.items()
+            },
+        }
+        if bc_dict is not None:
+            complete = bc_dict["unique_ref_overlaps"] | bc_dict["unique_ref_proxpeak"]
+            data.update(
+                {
+                    "overlap_counts": bc_dict["overlap_counts"],
+                    "full": bc_dict["full"],
+                    "front": bc_dict["front"],
+                    "end": bc_dict["end"],
+                    "ext": bc_dict["ext"],
+                    "unique_overlaps": np.count_nonzero(bc_dict["unique_ola_overlaps"]),
+                    "unique_proxpeaks": np.count_nonzero(
+                        bc_dict["unique_exp_proxpeak"]
+                    ),
+                    "ref_identified": np.count_nonzero(complete),
+                }
+            )
+        return data
 
     def generate_summary(self, bc_dict: dict, filepath: str, gtf: GTF = None):
         with open(filepath + "_summary.txt", "a") as summary:
@@ -650,13 +639,13 @@ class BindCompare:
                 f"Total Number of Experimental Peaks: {self.exp_bed.num_peaks}\n"
             )
             summary.write(
-                f"Total Number of Unique Overlaps: {len(bc_dict['unique_ola_overlaps'])}\n"
+                f"Total Number of Unique Overlaps: {np.count_nonzero(bc_dict['unique_ola_overlaps'])}\n"
             )
             summary.write(
                 f"Total Number of Overlaps: {bc_dict['overlap_counts']['Total']}\n"
             )
             summary.write(
-                f"Total Number of Reference Peaks Overlapped: {len(bc_dict['unique_ref_overlaps'])}\n"
+                f"Total Number of Reference Peaks Overlapped: {np.count_nonzero(bc_dict['unique_ref_overlaps'])}\n"
             )
             if gtf:
                 summary.write(
@@ -667,14 +656,40 @@ class BindCompare:
                     all_genes += gene + " "
                 summary.write(f"List of All Genes:\n{all_genes}")
 
-    def generate_all(self, bc_dict: dict, outpath: str, name: str, gtf: GTF = None):
-        """Generates all the visualizations and csv files."""
+    def generate_all(
+        self,
+        bc_dict: dict,
+        outpath: str,
+        name: str,
+        gtf: GTF = None,
+        plot_mode: str = "full",
+    ):
+        """Generates all the visualizations and csv files. The plots are rendered in
+        a process pool while the csv files are written."""
         # self.scatter_overlap_freq(bc_dict, filepath)
         filepath = outpath + name
-        self.overlap_distribution_barplot(bc_dict, filepath)
-        self.overlap_distribution_piechart(bc_dict, filepath)
-        self.plot_average_ref_peak(bc_dict, filepath)
-        self.plot_perchrom_ref_peak(filepath)
-        self.overlap_bar_totals(bc_dict, filepath)
-        self.generate_csv(bc_dict, filepath, outpath, name, gtf)
-        self.generate_summary(bc_dict, filepath, gtf)
+        jobs = []
+        if plot_mode != "none":
+            from . import plots
+
+            data = self.plot_data(bc_dict)
+            jobs = [
+                (plot, (data, filepath, plots.PLOT_DPI[plot_mode]))
+                for plot in plots.ALL_PLOTS
+            ]
+
+        # Workers of a batch pool are daemonic and cannot start a pool of their own.
+        if len(jobs) == 0 or current_process().daemon:
+            for plot, args in jobs:
+                plot(*args)
+            self.generate_csv(bc_dict, filepath, outpath, name, gtf)
+            self.generate_summary(bc_dict, filepath, gtf)
+            return
+
+        workers = min(len(jobs), os.cpu_count() or 1)
+        with Pool(workers, initializer=plots.init_worker) as pool:
+            pending = [pool.apply_async(plot, args) for plot, args in jobs]
+            self.generate_csv(bc_dict, filepath, outpath, name, gtf)
+            self.generate_summary(bc_dict, filepath, gtf)
+            for result in pending:
+                result.get()
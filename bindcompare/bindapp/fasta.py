@@ -0,0 +1,196 @@
+import gzip
+import mmap
+import os
+import struct
+import zlib
+
+import numpy as np
+
+# Magic bytes of a gzip member whose header carries the BGZF extra field.
+BGZF_MAGIC = b"\x1f\x8b\x08\x04"
+GZIP_MAGIC = b"\x1f\x8b"
+# Decompressed BGZF blocks kept around; sites are fetched mostly in genome order.
+BGZF_CACHE_BLOCKS = 64
+
+
+def chrom_key(name: str):
+    """Returns the chromosome key of a FASTA record name: its first word, without chr."""
+    name = name.split()[0]
+    return name[3:] if name.startswith("chr") else name
+
+
+class FastaIndex:
+    """Random access to the sequences of a FASTA file through a samtools-style .fai
+    index. The index is built (and saved next to the file) when it is missing. Plain
+    files are read through a memory map; bgzip-compressed files block by block."""
+
+    def __init__(self, fasta_file: str, capitalize: bool = True):
+        self.fasta_file = fasta_file
+        self.capitalize = capitalize
+        self.bgzf = is_bgzf(fasta_file)
+        # Chromosome key -> (length, offset, line bases, line width).
+        self.records = {}
+        self.blocks = None
+        self.block_cache = {}
+        self.handle = None
+        self.data = None
+        if self.bgzf:
+            self.blocks = bgzf_blocks(fasta_file)
+        self.load_index()
+
+    def __getstate__(self):
+        # Open files and memory maps are reopened on first use after unpickling.
+        state = self.__dict__.copy()
+        state["handle"], state["data"], state["block_cache"] = None, None, {}
+        return state
+
+    def load_index(self):
+        """Reads the .fai index, building it first if there is none."""
+        fai = self.fasta_file + ".fai"
+        if os.path.isfile(fai) and os.path.getmtime(fai) >= os.path.getmtime(
+            self.fasta_file
+        ):
+            with open(fai) as table:
+                lines = [line.split("\t") for line in table if line.strip()]
+        else:
+            lines = self.build_index()
+            try:
+                with open(fai, "w") as table:
+                    for line in lines:
+                        table.write("\t".join(str(field) for field in line) + "\n")
+            except OSError as e:
+                print(f"Unable to write FASTA index {fai}: {e}")
+        for name, length, offset, line_bases, line_width in (
+            line[:5] for line in lines
+        ):
+            self.records[chrom_key(name)] = (
+                int(length),
+                int(offset),
+                int(line_bases),
+                int(line_width),
+            )
+
+    def build_index(self):
+        """Scans the file once and returns the .fai rows of its records."""
+        rows = []
+        record = None
+        position = 0
+        for line in self.lines():
+            size = len(line)
+            if line.startswith(b">"):
+                if record is not None:
+                    rows.append(record[:5])
+                name = line[1:].split()[0].decode()
+                # name, length, offset, line bases, line width, last line short.
+                record = [name, 0, position + size, 0, 0, False]
+            elif record is not None and line.strip():
+                bases = len(line.rstrip(b"\r\n"))
+                if record[5] or (record[3] and bases > record[3]):
+                    raise ValueError(
+                        f"{self.fasta_file}: record {record[0]} has lines of uneven length."
+                    )
+                if record[3] == 0:
+                    record[3], record[4] = bases, size
+                elif bases < record[3] or size != record[4]:
+                    record[5] = True
+                record[1] += bases
+            position += size
+        if record is not None:
+            rows.append(record[:5])
+        return rows
+
+    def lines(self):
+        """Yields the raw lines of the (decompressed) file, with their line ends."""
+        opener = gzip.open if self.bgzf else open
+        with opener(self.fasta_file, "rb") as handle:
+            yield from handle
+
+    def read(self, start: int, end: int) -> bytes:
+        """Returns the bytes [start, end) of the (decompressed) file."""
+        if not self.bgzf:
+            if self.data is None:
+                self.handle = open(self.fasta_file, "rb")
+                self.data = mmap.mmap(self.handle.fileno(), 0, access=mmap.ACCESS_READ)
+            return self.data[start:end]
+
+        if self.handle is None:
+            self.handle = open(self.fasta_file, "rb")
+        offsets, sizes, starts = self.blocks
+        first = np.searchsorted(starts, start, side="right") - 1
+        last = np.searchsorted(starts, end, side="left")
+        chunks = []
+        for block in range(first, last):
+            if block not in self.block_cache:
+                if len(self.block_cache) >= BGZF_CACHE_BLOCKS:
+                    self.block_cache.clear()
+                self.handle.seek(offsets[block])
+                raw = self.handle.read(sizes[block])
+                self.block_cache[block] = zlib.decompress(raw, 31)
+            chunks.append(self.block_cache[block])
+        data = b"".join(chunks)
+        return data[start - starts[first] : end - starts[first]]
+
+    def fetch(self, chrom: str, start: int, end: int) -> str:
+        """Returns the sequence of chrom over [start, end), with the clipping of a
+        Python slice. Raises a KeyError for a chromosome missing from the FASTA."""
+        length, offset, line_bases, line_width = self.records[chrom]
+        start, end = max(0, min(start, length)), max(0, min(end, length))
+        if start >= end:
+            return ""
+        first = offset + (start // line_bases) * line_width + start % line_bases
+        last = offset + ((end - 1) // line_bases) * line_width + (end - 1) % line_bases
+        sequence = self.read(first, last + 1).translate(None, b"\r\n").decode()
+        return sequence.upper() if self.capitalize else sequence
+
+    def fetch_many(self, chroms, starts, ends) -> list:
+        """Returns the sequences of many sites, in input order. Sites are read one
+        chromosome at a time in position order, so reads move forward through the file.
+        """
+        chroms = np.asarray(chroms, dtype=object)
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        _, chrom_codes = np.unique(chroms, return_inverse=True)
+        sequences = [""] * len(chroms)
+        for i in np.lexsort((starts, chrom_codes)).tolist():
+            sequences[i] = self.fetch(chroms[i], int(starts[i]), int(ends[i]))
+        return sequences
+
+    def __contains__(self, chrom: str):
+        return chrom in self.records
+
+
+def is_bgzf(path: str):
+    """Returns True for a bgzip-compressed file. Raises a ValueError for a plain
+    gzip file, which cannot be read at random."""
+    with open(path, "rb") as handle:
+        header = handle.read(16)
+    if header.startswith(BGZF_MAGIC) and header[12:14] == b"BC":
+        return True
+    if header.startswith(GZIP_MAGIC):
+        raise ValueError(
+            f"{path} is gzip-compressed. Compress it with `bgzip` or decompress it."
+        )
+    return False
+
+
+def bgzf_blocks(path: str):
+    """Walks the BGZF block headers (without decompressing) and returns the arrays
+    (compressed offsets, compressed sizes, decompressed start positions)."""
+    offsets, sizes, lengths = [], [], []
+    with open(path, "rb") as handle:
+        offset = 0
+        while True:
+            header = handle.read(18)
+            if len(header) < 18:
+                break
+            # BSIZE is the total block size minus one, in the BC extra subfield.
+            size = struct.unpack("<H", header[16:18])[0] + 1
+            handle.seek(offset + size - 4)
+            length = struct.unpack("<I", handle.read(4))[0]
+            offsets.append(offset)
+            sizes.append(size)
+            lengths.append(length)
+            offset += size
+            handle.seek(offset)
+    starts = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+    return np.array(offsets, dtype=np.int64), np.array(sizes), starts
@@ -8,17 +8,19 @@
 #         List of Identified Genes
 ###############
 
-import sys
 import os
-import numpy as np
-import matplotlib.pyplot as plt
-import pandas as pd
 
 # from utils import process_bed, process_gtf, average_peak_size, within
-from .merge_class import Bed, GTF
+from .merge_class import Bed, GTF, feature_option
+from .utils import user_cache_dir
 from .exp_class import BindCompare
 
 
+def scope_dir(out_name: str, scope: int):
+    """Returns the output sub-directory for one scope of a multi-scope sweep."""
+    return os.path.join(out_name, f"scope_{scope}") + "/"
+
+
 def main(
     base_bed: str,
     overlay_bed: str,
@@ -26,21 +28,68 @@ def main(
     sample_name: str,
     out_name: str,
     gtf: str,
+    engine: str = "numpy",
+    threads: int = 1,
+    cache_dir: str = None,
+    scopes: list = None,
+    gtf_feature: str = "gene",
+    plot_mode: str = "full",
 ):
+    """Compares the BED files and writes the results of every scope.
+    Returns the overlap table of each scope, in ascending scope order."""
     os.write(1, b"Beginning BindCompare!\n")
 
+    # A sweep compares once at the largest scope and derives the smaller ones.
+    # Given --scopes, results always go to the per-scope sub-directories.
+    sweep = scopes is not None
+    scopes = sorted(set(scopes)) if sweep else [int(scope)]
+
     # Initialize the BED Files
-    base_bed = Bed(base_bed)
-    overlay_bed = Bed(overlay_bed)
+    base_bed = Bed(base_bed, columnar=True, cache_dir=cache_dir)
+    overlay_bed = Bed(overlay_bed, columnar=True, cache_dir=cache_dir)
 
     # Process the BED Files
-    base_bed.process_bed(True, int(scope))
-    overlay_bed.process_bed(False, int(scope))
+    base_bed.process_bed(True, scopes[-1])
+    overlay_bed.process_bed(False, scopes[-1])
 
     # Set up the BindCompare Experiment
-    exp = BindCompare(base_bed, overlay_bed, int(scope))
+    exp = BindCompare(base_bed, overlay_bed, scopes[-1], engine, int(threads))
     exp.compare_binds()
 
+    # # Gene Coordinate Section
+    if gtf == "None":
+        gtf = None
+    else:
+        # The prebuilt gene index is kept with the BED cache, or per user.
+        gtf = GTF(gtf, feature_option(gtf_feature), cache_dir or user_cache_dir())
+        gtf.process_gtf()
+
+    if not sweep:
+        bc_it = write_results(exp, sample_name, out_name, gtf, plot_mode)
+        return [bc_it["overlap_table"]]
+    tables = []
+    for this_scope in scopes:
+        outdir = scope_dir(out_name, this_scope)
+        os.makedirs(outdir, exist_ok=True)
+        os.write(1, f"Writing results for scope {this_scope}...\n".encode())
+        bc_it = write_results(
+            exp.at_scope(this_scope), sample_name, outdir, gtf, plot_mode
+        )
+        tables.append(bc_it["overlap_table"])
+    return tables
+
+
+def write_results(
+    exp: BindCompare,
+    sample_name: str,
+    out_name: str,
+    gtf: GTF,
+    plot_mode: str = "full",
+):
+    """Writes the summary, plots and CSVs of a finished comparison.
+    Returns the BC dictionary the outputs were generated from."""
+    base_bed, overlay_bed = exp.ref_bed, exp.exp_bed
+
     # Get the Chromosomes
     b_chroms = base_bed.get_chroms()
     e_chroms = overlay_bed.get_chroms()
@@ -54,16 +103,9 @@ def main(
             f"Overlayed BED File: {overlay_bed.average_peak_size(e_chroms)} base pairs.\n"
         )
 
-    # # Gene Coordinate Section
-    if gtf == "None":
-        gtf = None
-    else:
-        gtf = GTF(gtf)
-        gtf.process_gtf()
-
     # Get the BC Dictionary for All Chromosomes
-    exp.compare_binds()
     bc_it = exp.get_experiments_overlaps_it(b_chroms)
 
     # Perform all Plotting
-    exp.generate_all(bc_it, out_name, sample_name, gtf)
+    exp.generate_all(bc_it, out_name, sample_name, gtf, plot_mode)
+    return bc_it
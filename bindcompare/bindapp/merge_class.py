@@ -1,35 +1,123 @@
-from intervaltree import Interval, IntervalTree
+import csv
+import json
+import os
+import numpy as np
+import pandas as pd
+from .utils import expand_ranges, file_digest, file_stat, options_digest
+from typing import TYPE_CHECKING
+
+# intervaltree is only needed by the row-by-row parser and the intervaltree engine.
+if TYPE_CHECKING:
+    from intervaltree import IntervalTree
+
+BED_CHUNKSIZE = 1_000_000
+# Bump when the parsing rules change so that old caches are not reused.
+BED_CACHE_VERSION = "bed-columnar-v1;max_chrom_len=5"
+GTF_CACHE_VERSION = "gtf-index-v3;max_chrom_len=6"
+# The gene ID token of a GTF attributes column, without its quotes.
+GENE_ID_PATTERN = r'gene_id\s+"?([^";\s]+)'
+
+
+def clean_chrom(chrom: str, max_len: int):
+    """Strips the chr prefix from a chromosome name.
+    Returns None for unplaced (Un) or otherwise filtered chromosomes."""
+    if chrom[0:3] == "chr" or chrom[0:3] == "Chr":
+        chrom = chrom[3:]
+    if chrom[0:2] == "Un" or len(chrom) > max_len or chrom == "chr":
+        return None
+    return chrom
+
+
+def write_cache(prefix: str, array: np.ndarray, table: dict):
+    """Writes a cache entry: an .npy array and a .json table next to it.
+    Files are written under temporary names first so that concurrent runs never
+    see partial files; the .json is moved into place last and marks the entry as
+    complete."""
+    os.makedirs(os.path.dirname(prefix), exist_ok=True)
+    tmp = f"{prefix}.{os.getpid()}.tmp"
+    with open(tmp + ".npy", "wb") as handle:
+        np.save(handle, array)
+    with open(tmp + ".json", "w") as handle:
+        json.dump(table, handle)
+    os.replace(tmp + ".npy", prefix + ".npy")
+    os.replace(tmp + ".json", prefix + ".json")
+
+
+def write_table(prefix: str, table: dict):
+    """Replaces the .json table of an existing cache entry, leaving its array."""
+    tmp = f"{prefix}.{os.getpid()}.tmp"
+    with open(tmp + ".json", "w") as handle:
+        json.dump(table, handle)
+    os.replace(tmp + ".json", prefix + ".json")
+
+
+def feature_option(feature: str):
+    """Maps the command line feature option to GTF's feature argument."""
+    return None if feature == "all" else feature
+
+
+def numeric_column(column: pd.Series):
+    """Returns a mask of the rows that hold a plain non-negative integer, and the
+    column as int64 (0 where the mask is False)."""
+    if pd.api.types.is_integer_dtype(column.dtype):
+        values = column.to_numpy(dtype=np.int64)
+        return values >= 0, values
+    if pd.api.types.is_float_dtype(column.dtype):
+        # Integer column with missing fields on some rows.
+        values = column.to_numpy(dtype=np.float64)
+        mask = np.isfinite(values) & (values >= 0) & (values == np.floor(values))
+        return mask, np.where(mask, values, 0).astype(np.int64)
+    # Mixed column (e.g. a track line in this chunk): fall back to string checks.
+    column = column.astype(str)
+    mask = column.str.isnumeric().to_numpy(dtype=bool, na_value=False)
+    values = np.zeros(len(column), dtype=np.int64)
+    values[mask] = column[mask].to_numpy(dtype=np.int64)
+    return mask, values
 
 
 class Bed:
-    def __init__(self, bedfile: str):
+    def __init__(self, bedfile: str, columnar: bool = False, cache_dir: str = None):
         self.bedfile = bedfile
+        self.columnar = columnar
+        self.cache_dir = cache_dir
         self.chroms = []
         self.loci = {}
         self.loci_it = {}
         self.num_peaks = 0
 
+        # Columnar mode: per-chromosome start/end arrays and a chromosome-to-ID table.
+        self.chrom_ids = {}
+        self.starts = {}
+        self.ends = {}
+        self.is_ref = False
+        self.scope = 0
+
     def update_chroms(self, chrom: str, start: str, end: str, is_ref: bool, scope: int):
         """Update the chroms and loci attributes. Cast start and end to int."""
         start, end = int(start), int(end)
         self.num_peaks = self.num_peaks + 1
         if chrom not in self.chroms:
+            from intervaltree import IntervalTree
+
             self.chroms.append(chrom)
             self.loci[chrom] = [(start, end)]
             self.loci_it[chrom] = IntervalTree()
         else:
             self.loci[chrom].append((start, end))
 
+        # The interval data is the peak's index in loci, so duplicate peaks stay distinct.
+        index = len(self.loci[chrom]) - 1
         midpoint = int((start + end) / 2)
         if is_ref:
-            self.loci_it[chrom][midpoint - scope : midpoint + scope + 1] = (start, end)
-            # "{}:{}-{}".format(chrom, start, end)
+            self.loci_it[chrom][midpoint - scope : midpoint + scope + 1] = index
         else:
-            self.loci_it[chrom][start:end] = (start, end)
-            # "{}:{}-{}".format(chrom, start, end)
+            self.loci_it[chrom][start:end] = index
 
     def process_bed(self, is_ref: bool, scope: int):
         """Process the bedfile and update the chroms and loci attributes."""
+        if self.columnar:
+            self.process_bed_columnar(is_ref, scope)
+            return
         reference_peaks = {}
         with open(self.bedfile) as table:
             for line in table:
@@ -49,6 +137,114 @@ class Bed:
                             this_chrom, bed_row[1], bed_row[2], is_ref, scope
                         )
 
+    def process_bed_columnar(self, is_ref: bool, scope: int):
+        """Bulk-parse the bedfile into per-chromosome start/end arrays.
+        Applies the same chromosome filtering rules as process_bed. When a cache_dir
+        is set, the arrays are reused from (or written to) the on-disk cache."""
+        self.is_ref, self.scope = is_ref, scope
+        if self.cache_dir is not None and self.load_cache():
+            return
+        self.parse_bed_columnar()
+        if self.cache_dir is not None:
+            self.save_cache()
+
+    def parse_bed_columnar(self):
+        """Reads the bedfile in chunks with the pandas C reader."""
+        starts, ends = {}, {}
+        reader = pd.read_csv(
+            self.bedfile,
+            sep=r"\s+",
+            header=None,
+            # Fixed names, so that short track or header lines do not set the width.
+            names=range(3),
+            usecols=[0, 1, 2],
+            dtype={0: str},
+            quoting=csv.QUOTE_NONE,
+            chunksize=BED_CHUNKSIZE,
+        )
+        for chunk in reader:
+            # Filter on the distinct chromosome names only, then map back to rows.
+            codes, raw_names = pd.factorize(chunk[0])
+            names = [clean_chrom(name, 5) for name in raw_names]
+            valid = np.array([name is not None for name in names] + [False])
+            start_ok, chunk_starts = numeric_column(chunk[1])
+            end_ok, chunk_ends = numeric_column(chunk[2])
+            keep = valid[codes] & start_ok & end_ok
+            codes = codes[keep]
+            chunk_starts, chunk_ends = chunk_starts[keep], chunk_ends[keep]
+
+            # Chromosome IDs are assigned in order of first appearance.
+            seen, first = np.unique(codes, return_index=True)
+            for code in seen[np.argsort(first)]:
+                name = names[code]
+                if name not in self.chrom_ids:
+                    self.chrom_ids[name] = len(self.chroms)
+                    self.chroms.append(name)
+                    starts[name], ends[name] = [], []
+            lut = np.zeros(len(names), dtype=np.int64)
+            lut[seen] = [self.chrom_ids[names[code]] for code in seen]
+            chrom_ids = lut[codes]
+
+            # Group the rows of this chunk by chromosome, keeping file order.
+            order = np.argsort(chrom_ids, kind="stable")
+            bounds = np.cumsum(np.bincount(chrom_ids, minlength=len(self.chroms)))
+            for chrom_id, rows in enumerate(np.split(order, bounds[:-1])):
+                if len(rows) == 0:
+                    continue
+                name = self.chroms[chrom_id]
+                starts[name].append(chunk_starts[rows])
+                ends[name].append(chunk_ends[rows])
+
+        for chrom in self.chroms:
+            self.starts[chrom] = np.concatenate(starts[chrom])
+            self.ends[chrom] = np.concatenate(ends[chrom])
+        self.num_peaks = sum(len(self.starts[chrom]) for chrom in self.chroms)
+
+    def cache_path(self):
+        """Returns the cache path prefix, keyed by file content and parsing options.
+        A changed file hashes to a new key, so stale caches are never read."""
+        digest = file_digest(self.bedfile, BED_CACHE_VERSION)
+        name = f"{os.path.basename(self.bedfile)}.{digest[:20]}"
+        return os.path.join(self.cache_dir, name)
+
+    def load_cache(self):
+        """Loads the columnar arrays from the cache as a memory map.
+        Returns False if there is no cache for the current file contents."""
+        prefix = self.cache_path()
+        if not os.path.isfile(prefix + ".json"):
+            return False
+        with open(prefix + ".json") as handle:
+            table = json.load(handle)
+        loci = np.load(prefix + ".npy", mmap_mode="r")
+        offsets = table["offsets"]
+        self.chroms = table["chroms"]
+        self.chrom_ids = {chrom: i for i, chrom in enumerate(self.chroms)}
+        for i, chrom in enumerate(self.chroms):
+            self.starts[chrom] = loci[0, offsets[i] : offsets[i + 1]]
+            self.ends[chrom] = loci[1, offsets[i] : offsets[i + 1]]
+        self.num_peaks = offsets[-1]
+        return True
+
+    def save_cache(self):
+        """Writes the columnar arrays to the cache: a (2, N) int64 .npy file of
+        starts/ends and a .json table of chromosomes and their offsets."""
+        prefix = self.cache_path()
+        sizes = [len(self.starts[chrom]) for chrom in self.chroms]
+        offsets = np.concatenate([[0], np.cumsum(sizes, dtype=np.int64)])
+        loci = np.empty((2, offsets[-1]), dtype=np.int64)
+        for i, chrom in enumerate(self.chroms):
+            loci[0, offsets[i] : offsets[i + 1]] = self.starts[chrom]
+            loci[1, offsets[i] : offsets[i + 1]] = self.ends[chrom]
+        table = {
+            "bedfile": os.path.abspath(self.bedfile),
+            "chroms": self.chroms,
+            "offsets": offsets.tolist(),
+        }
+        try:
+            write_cache(prefix, loci, table)
+        except OSError as e:
+            print(f"Unable to write BED cache in {self.cache_dir}: {e}")
+
     def get_chroms(self):
         """Returns a list of chromosomes."""
         return self.chroms
@@ -57,19 +253,43 @@ class Bed:
         """Returns a dictionary of loci for the given chromosomes."""
         loci = {}
         for chrom in chroms:
-            loci[chrom] = self.loci[chrom]
+            loci[chrom] = self.get_chrom(chrom)
         return loci
 
     def get_chrom(self, chrom: str) -> list:
         """Returns a list of loci for the given chromosome."""
+        if self.columnar:
+            return self.get_chrom_array(chrom)
         return self.loci[chrom]
 
-    def get_chrom_it(self, chrom: str) -> IntervalTree:
+    def get_chrom_array(self, chrom: str) -> np.ndarray:
+        """Returns an (N, 2) array of (start, end) loci for the given chromosome."""
+        if self.columnar:
+            return np.column_stack((self.starts[chrom], self.ends[chrom]))
+        return np.asarray(self.loci[chrom], dtype=np.int64).reshape(-1, 2)
+
+    def get_chrom_it(self, chrom: str) -> "IntervalTree":
         """Returns a interval tree of loci for the given chromosome."""
+        if self.columnar and chrom not in self.loci_it:
+            # Built on first use from the columnar arrays.
+            from intervaltree import IntervalTree
+
+            tree = IntervalTree()
+            loci = zip(self.starts[chrom].tolist(), self.ends[chrom].tolist())
+            for index, (start, end) in enumerate(loci):
+                if self.is_ref:
+                    midpoint = int((start + end) / 2)
+                    tree[midpoint - self.scope : midpoint + self.scope + 1] = index
+                else:
+                    tree[start:end] = index
+            self.loci_it[chrom] = tree
         return self.loci_it[chrom]
 
     def average_peak_size(self, chroms: list):
         """Returns the average peak size for the given chromosomes."""
+        if self.columnar:
+            total_sum = sum(int((self.ends[c] - self.starts[c]).sum()) for c in chroms)
+            return total_sum / sum(len(self.starts[c]) for c in chroms)
         total_sum, total_peaks = 0, 0
         for chrom in chroms:
             values = self.loci[chrom]
@@ -79,78 +299,230 @@ class Bed:
 
 
 class GTF:
-    def __init__(self, gtf_file: str):
+    def __init__(self, gtf_file: str, feature: str = "gene", cache_dir: str = None):
         self.gtf_file = gtf_file
+        self.cache_dir = cache_dir
+        # Only rows of this feature type are indexed. None indexes every row.
+        self.feature = feature
         self.chroms = []
-        self.loci = {}
 
-    def update_chroms(self, chrom: str, gene: str, start: str, end: str):
-        """Update the chroms and loci attributes. Cast start and end to int."""
-        start, end = int(start), int(end)
-        if chrom not in self.chroms:
-            self.chroms.append(chrom)
-            # self.loci[chrom] = [(gene, start, end)]
-            self.loci[chrom] = IntervalTree()
-        # self.loci[chrom].append((gene, start, end))
-        if start == end:
-            end += 1
-        self.loci[chrom][start:end] = gene
+        # Per-chromosome intervals sorted by start, and their codes into genes.
+        self.genes = np.array([], dtype=object)
+        self.starts = {}
+        self.ends = {}
+        self.codes = {}
+        # Longest interval per chromosome, bounds the search window of a lookup.
+        self.max_len = {}
 
     def process_gtf(self):
-        """Process the gtf file and update the chroms and loci attributes."""
-        with open(self.gtf_file) as table:
-            for line in table:
-                gtf_row = line.split()
-                if (gtf_row[0])[0:3] == "chr" or (gtf_row[0])[0:3] == "Chr":
-                    gtf_row[0] = (gtf_row[0])[3:]
-                if (
-                    (gtf_row[0])[0:2] == "Un"
-                    or (len(gtf_row[0]) > 6)
-                    or (gtf_row[0] == "chr")
-                ):
-                    continue
-                else:
-                    this_chrom = gtf_row[0]
-                    if str.isnumeric(gtf_row[3]) and str.isnumeric(gtf_row[4]):
-                        try:
-                            gene_index = gtf_row.index("gene_id")
-                            if gene_index == len(gtf_row) - 1:
-                                continue
-                        except ValueError:
-                            print('"gene_id" not found in GTF attributes column.')
-                        self.update_chroms(
-                            this_chrom, gtf_row[gene_index + 1], gtf_row[3], gtf_row[4]
-                        )
+        """Builds the gene index. When a cache_dir is set, the index is loaded from
+        (or written to) the prebuilt index for this gtf file and feature type."""
+        if self.cache_dir is not None and self.load_cache():
+            return
+        self.parse_gtf()
+        if self.cache_dir is not None:
+            self.save_cache()
+
+    def parse_gtf(self):
+        """Bulk-parse the gtf file (plain or gzipped) into sorted interval arrays.
+        Gene IDs are cleaned of quotes and semicolons once, here."""
+        starts, ends, genes = {}, {}, {}
+        gene_codes = {}
+        reader = pd.read_csv(
+            self.gtf_file,
+            sep="\t",
+            header=None,
+            # Fixed column names so that short header lines do not set the width.
+            names=range(9),
+            usecols=[0, 2, 3, 4, 8],
+            dtype={0: str, 2: str, 8: str},
+            quoting=csv.QUOTE_NONE,
+            chunksize=BED_CHUNKSIZE,
+        )
+        for chunk in reader:
+            if self.feature is not None:
+                chunk = chunk[chunk[2] == self.feature]
+            gene_ids = chunk[8].str.extract(GENE_ID_PATTERN, expand=False)
+            codes, raw_names = pd.factorize(chunk[0])
+            names = [clean_chrom(name, 6) for name in raw_names]
+            valid = np.array([name is not None for name in names] + [False])
+            start_ok, chunk_starts = numeric_column(chunk[3])
+            end_ok, chunk_ends = numeric_column(chunk[4])
+            keep = valid[codes] & start_ok & end_ok & (chunk_ends >= chunk_starts)
+            keep &= gene_ids.notna().to_numpy()
+            codes, gene_ids = codes[keep], gene_ids[keep]
+            chunk_starts, chunk_ends = chunk_starts[keep], chunk_ends[keep]
+            # A zero-length feature still covers its one position.
+            chunk_ends = chunk_ends + (chunk_starts == chunk_ends)
+
+            gene_lut, gene_names = pd.factorize(gene_ids)
+            gene_lut = np.array(
+                [gene_codes.setdefault(gene, len(gene_codes)) for gene in gene_names],
+                dtype=np.int64,
+            )[gene_lut]
+            for code in np.unique(codes):
+                name = names[code]
+                if name not in starts:
+                    self.chroms.append(name)
+                    starts[name], ends[name], genes[name] = [], [], []
+                rows = codes == code
+                starts[name].append(chunk_starts[rows])
+                ends[name].append(chunk_ends[rows])
+                genes[name].append(gene_lut[rows])
+
+        self.genes = np.array(list(gene_codes), dtype=object)
+        # Intervals with the same start and end are ordered by gene ID.
+        gene_rank = np.argsort(np.argsort(self.genes.astype(str), kind="stable"))
+        for chrom in self.chroms:
+            chrom_starts = np.concatenate(starts[chrom])
+            chrom_ends = np.concatenate(ends[chrom])
+            chrom_codes = np.concatenate(genes[chrom])
+            order = np.lexsort((gene_rank[chrom_codes], chrom_ends, chrom_starts))
+            self.starts[chrom] = chrom_starts[order]
+            self.ends[chrom] = chrom_ends[order]
+            self.codes[chrom] = chrom_codes[order]
+            self.max_len[chrom] = int((chrom_ends - chrom_starts).max())
+
+    def cache_path(self):
+        """Returns the index path prefix, keyed by file path and feature type."""
+        path = os.path.abspath(self.gtf_file)
+        digest = options_digest(path, GTF_CACHE_VERSION, self.feature)
+        name = f"{os.path.basename(self.gtf_file)}.{digest[:20]}"
+        return os.path.join(self.cache_dir, name)
+
+    def load_cache(self):
+        """Loads the prebuilt index, with the interval arrays as a memory map.
+        Returns False if there is no index for the current file contents. The file
+        is only hashed again when its size or modification time changed."""
+        prefix = self.cache_path()
+        if not os.path.isfile(prefix + ".json"):
+            return False
+        with open(prefix + ".json") as handle:
+            table = json.load(handle)
+        stat = file_stat(self.gtf_file)
+        if table["stat"] != stat:
+            if table["digest"] != file_digest(self.gtf_file):
+                return False
+            # Same contents under a new mtime (touched or copied over).
+            table["stat"] = stat
+            try:
+                write_table(prefix, table)
+            except OSError:
+                pass
+        loci = np.load(prefix + ".npy", mmap_mode="r")
+        offsets = table["offsets"]
+        self.chroms = table["chroms"]
+        self.genes = np.array(table["genes"], dtype=object)
+        for i, chrom in enumerate(self.chroms):
+            self.starts[chrom] = loci[0, offsets[i] : offsets[i + 1]]
+            self.ends[chrom] = loci[1, offsets[i] : offsets[i + 1]]
+            self.codes[chrom] = loci[2, offsets[i] : offsets[i + 1]]
+            self.max_len[chrom] = table["max_len"][i]
+        return True
+
+    def save_cache(self):
+        """Writes the index: a (3, N) int64 .npy file of starts/ends/gene codes and a
+        .json table of chromosomes, their offsets and the gene ID string table."""
+        prefix = self.cache_path()
+        sizes = [len(self.starts[chrom]) for chrom in self.chroms]
+        offsets = np.concatenate([[0], np.cumsum(sizes, dtype=np.int64)])
+        loci = np.empty((3, offsets[-1]), dtype=np.int64)
+        for i, chrom in enumerate(self.chroms):
+            loci[0, offsets[i] : offsets[i + 1]] = self.starts[chrom]
+            loci[1, offsets[i] : offsets[i + 1]] = self.ends[chrom]
+            loci[2, offsets[i] : offsets[i + 1]] = self.codes[chrom]
+        # Taken before hashing, so a change while hashing makes the next run rehash.
+        stat = file_stat(self.gtf_file)
+        table = {
+            "gtf_file": os.path.abspath(self.gtf_file),
+            "stat": stat,
+            "digest": file_digest(self.gtf_file),
+            "feature": self.feature,
+            "chroms": self.chroms,
+            "offsets": offsets.tolist(),
+            "max_len": [self.max_len[chrom] for chrom in self.chroms],
+            "genes": self.genes.tolist(),
+        }
+        try:
+            write_cache(prefix, loci, table)
+        except OSError as e:
+            print(f"Unable to write GTF index in {self.cache_dir}: {e}")
 
     def get_chroms(self):
         """Returns a list of chromosomes."""
         return self.chroms
 
     def get_loci(self, chroms: list):
-        """Returns a dictionary of loci for the given chromosomes."""
+        """Returns a dictionary of (starts, ends, gene IDs) arrays for the given chromosomes."""
         loci = {}
         for chrom in chroms:
-            loci[chrom] = self.loci[chrom]
+            loci[chrom] = (
+                self.starts[chrom],
+                self.ends[chrom],
+                self.genes[self.codes[chrom]],
+            )
         return loci
 
+    def overlapping(self, chrom: str, begin: int, end: int) -> np.ndarray:
+        """Returns the gene codes of the intervals overlapping [begin, end),
+        in order of interval start."""
+        starts, ends = self.starts[chrom], self.ends[chrom]
+        lo = np.searchsorted(starts, begin - self.max_len[chrom], side="right")
+        hi = np.searchsorted(starts, end, side="left")
+        hits = self.codes[chrom][lo:hi][ends[lo:hi] > begin]
+        _, first = np.unique(hits, return_index=True)
+        return hits[np.sort(first)]
+
     def find_fbgn(self, chrom: str, begin: str, end: str, scope: int, all_genes: set):
         """Returns the gene ID for the given chromosome, begin, and end."""
-        # print(f"Finding FBGN for {chrom}:{begin}-{end}")
-        genes = set()
+        found = "Not in GTF"
         begin = int(begin) - scope
         end = int(end) + scope
-        found = "Not in GTF"
-        if chrom in self.loci:
-            overlaps = self.loci[chrom][begin:end]
-            if len(overlaps) == 0:
-                return found
-            for gene_interval in overlaps:
-                _, _, gene_id = gene_interval
-                to_add = gene_id.replace('"', "").replace(";", "")
-                genes.add(to_add)
-                all_genes.add(to_add)
-            if len(genes) != 0:
-                found = " ".join(list(genes))
-            return found
-        else:
+        if chrom not in self.starts or begin >= end:
             return found
+        genes = self.genes[self.overlapping(chrom, begin, end)].tolist()
+        if len(genes) != 0:
+            all_genes.update(genes)
+            found = " ".join(genes)
+        return found
+
+    def annotate(self, chroms, begins, ends, scope: int):
+        """Finds the genes within scope of every (chrom, begin, end) site at once.
+        Returns one label per site, in the format of find_fbgn, and a list of the
+        distinct gene IDs found, in GTF order."""
+        begins = np.asarray(begins, dtype=np.int64) - scope
+        ends = np.asarray(ends, dtype=np.int64) + scope
+        labels = np.full(len(begins), "Not in GTF", dtype=object)
+        found = []
+        site_chroms, names = pd.factorize(np.asarray(chroms))
+        for code, chrom in enumerate(names):
+            if chrom not in self.starts:
+                continue
+            sites = np.flatnonzero(site_chroms == code)
+            site_begins, site_ends = begins[sites], ends[sites]
+
+            # Candidate intervals start in (begin - max_len, end) of their site.
+            starts = self.starts[chrom]
+            lo = np.searchsorted(starts, site_begins - self.max_len[chrom], "right")
+            hi = np.searchsorted(starts, site_ends, side="left")
+            hi = np.where(site_begins < site_ends, np.maximum(hi, lo), lo)
+            flat, owner = expand_ranges(lo, hi)
+            hit = self.ends[chrom][flat] > site_begins[owner]
+            owner, genes = owner[hit], self.codes[chrom][flat[hit]]
+
+            # Drop repeated genes of a site, keeping the order of interval starts.
+            _, first = np.unique(owner * len(self.genes) + genes, return_index=True)
+            first.sort()
+            owner, genes = owner[first], genes[first]
+            found.append(genes)
+            if len(owner) == 0:
+                continue
+
+            gene_names = self.genes[genes].tolist()
+            bounds = np.flatnonzero(np.diff(owner)) + 1
+            firsts = np.concatenate([[0], bounds]).tolist()
+            lasts = np.append(bounds, len(owner)).tolist()
+            for a, b in zip(firsts, lasts):
+                labels[sites[owner[a]]] = " ".join(gene_names[a:b])
+        all_genes = np.unique(np.concatenate(found)) if found else []
+        return labels.tolist(), self.genes[all_genes].tolist()
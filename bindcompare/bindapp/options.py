@@ -0,0 +1,6 @@
+"""Option values shared by the command line tools.
+Kept free of heavy imports, so that argument parsing (and --help) stays fast."""
+
+ENGINES = ["numpy", "intervaltree"]
+EXPLORE_ENGINES = ["sparse", "bitset"]
+PLOT_MODES = ["none", "fast", "full"]
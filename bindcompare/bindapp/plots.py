@@ -0,0 +1,329 @@
+import numpy as np
+import matplotlib
+import matplotlib.pyplot as plt
+import matplotlib.patches as mpatches
+
+FONT = {"fontname": "Sans Serif"}
+# Resolution of the saved figures for each plot mode.
+PLOT_DPI = {"fast": 72, "full": 300}
+
+
+def profile_points(profile: np.ndarray, scope: int):
+    """Returns the offsets and counts of the non-zero positions of an offset profile."""
+    x = np.arange(-scope, scope + 1)
+    nonzero = profile != 0
+    return x[nonzero], profile[nonzero]
+
+
+def overlap_distribution_barplot(data: dict, filepath: str, dpi: int = 300):
+    """Takes the overlap counts and generates a single bar split by overlap category."""
+    # Sample data generation
+    overlap_types = [
+        "Full Overlap (CRO)",
+        "Front Overlap (ORF)",
+        "End Overlap (ORE)",
+        "Proximal Peak (PXP)",
+    ]
+    counts = data["overlap_counts"]
+    values = [counts["CRO"], counts["ORF"], counts["ORE"], counts["PXP"]]
+    total = sum(values)
+
+    if total == 0:
+        print("Overlap Distribution Plot Terminated... no counts found.")
+        return
+
+    values = [val / total for val in values]
+
+    # Your code for plotting
+    fig, ax = plt.subplots(figsize=(10, 2))
+
+    left = 0
+    colors = ["purple", "red", "blue", "yellow"]
+    for i, value in enumerate(values):
+        ax.barh(
+            0,
+            value,
+            left=left,
+            label=overlap_types[i],
+            edgecolor="black",
+            linewidth=1,
+            color=colors[i],
+        )
+        left += value
+
+    ax.set_xlim(0, 1)
+    ax.set_ylim(-0.5, 0.5)
+    ax.set_xlabel("Distribution of Overlap Type Frequencies")
+
+    # Hide y-axis labels
+    ax.get_yaxis().set_visible(False)
+
+    # Set a title
+    ax.set_title("Stacked Bar Plot of Overlap Categories")
+
+    # Add a custom legend item for the total without a color
+    legend_total = mpatches.Patch(label=f"Total: {total:.0f}", color="none")
+    handles, labels = ax.get_legend_handles_labels()
+    handles.append(legend_total)
+
+    # Create the legend
+    ax.legend(handles=handles, loc="center left", bbox_to_anchor=(1, 0.5))
+
+    plt.subplots_adjust(left=0.05, right=0.85, top=0.9, bottom=0.1)  # Adjust the layout
+
+    plt.savefig(filepath + "_bardist.png", bbox_inches="tight", dpi=dpi)
+    plt.close()
+
+
+def overlap_distribution_piechart(data: dict, filepath: str, dpi: int = 300):
+    """Takes the overlap counts and generates a pie chart split by overlap category."""
+    categories = [
+        "Complete Overlap",
+        "Overlap Ref. Front",
+        "Overlap Ref. End",
+        "Proximal Peak",
+    ]
+
+    counts = [
+        data["overlap_counts"]["CRO"],
+        data["overlap_counts"]["ORF"],
+        data["overlap_counts"]["ORE"],
+        data["overlap_counts"]["PXP"],
+    ]
+    colors = ["purple", "red", "blue", "yellow"]
+    total = sum(counts)
+    fig1, ax1 = plt.subplots()
+
+    def pie_fmt(x):
+        return "{:.0f}".format((total) * x / 100)
+
+    ax1.pie(counts, labels=categories, autopct=pie_fmt, startangle=90, colors=colors)
+    ax1.axis("equal")
+
+    plt.title(f"Categorization of {total} Found Overlaps", **FONT)
+    plt.savefig(filepath + "_pie.png", dpi=dpi)
+    plt.close()
+
+
+def overlap_bar_totals(data: dict, filepath: str, dpi: int = 300):
+    categories = [
+        "Exp. Binding\nPeaks",
+        "Unique Overlaps",
+        "Total No.\nof Overlaps",
+        "Unique\nProx. Peaks",
+        "Total No. of\nProx. Peaks",
+        "Reference\nPeaks Identified",
+    ]
+
+    overlap_total = (
+        data["overlap_counts"]["CRO"]
+        + data["overlap_counts"]["ORF"]
+        + data["overlap_counts"]["ORE"]
+    )
+
+    vals = [
+        data["num_exp_peaks"],
+        data["unique_overlaps"],
+        overlap_total,
+        data["unique_proxpeaks"],
+        data["overlap_counts"]["PXP"],
+        data["ref_identified"],
+    ]
+    bars = plt.bar(
+        categories,
+        vals,
+        color=[
+            "steelblue",
+            "sandybrown",
+            "lightgrey",
+            "peru",
+            "slategrey",
+            "cornflowerblue",
+        ],
+    )
+
+    for bar in bars:
+        yval = bar.get_height()
+        plt.text(bar.get_x() + 0.25, yval + 0.35, yval, wrap=True)
+
+    plt.xticks(fontsize=7)
+
+    plt.ylabel("")
+    plt.xlabel("")
+    plt.title("Total Number of Overlaps and Binding Peaks in Overlayed Bed")
+    plt.savefig(filepath + "_barsummary.png", dpi=dpi)
+    plt.close()
+
+
+def plot_perchrom_ref_peak(data: dict, filepath: str, dpi: int = 300):
+    """The same plot as plot_average_ref_peak but creates N subplots for each chromosome on one panel.
+    There will be at most 3 plots on each row and there will be however many rows needed to fit all the chromosomes.
+    """
+    scope = data["scope"]
+    # Determine Number of Chromosomes
+    chroms = sorted(
+        list(data["chroms"].keys()),
+        key=lambda x: (x.isdigit(), int(x) if x.isdigit() else x),
+    )
+    Nchroms = len(chroms)
+
+    num_rows = Nchroms // 3
+    num_rows = num_rows if num_rows * 3 == Nchroms else num_rows + 1
+    fig, axs = plt.subplots(
+        num_rows, 3, sharex=True, sharey="all", figsize=(13, Nchroms // 2 + 3)
+    )
+    if Nchroms == 1:
+        axs = [axs]
+    else:
+        axs = axs.flatten()
+
+    for i in range(Nchroms):
+        chrom, ax = chroms[i], axs[i]
+        chrom_data = data["chroms"][chrom]
+        num_peaks = chrom_data["num_ref_peaks"]
+        x = np.arange(-scope, scope + 1, 1)
+        y = chrom_data["ref"] / num_peaks
+        ax.plot(x, y, label="Average Ref. Peak", c="k", alpha=0.7)
+        ax2 = ax.twinx()
+
+        data_arrays = [
+            chrom_data["full"],
+            chrom_data["front"],
+            chrom_data["end"],
+            chrom_data["ext"],
+        ]
+        colors = ["m", "r", "b", "y"]
+
+        for arr, color in zip(data_arrays, colors):
+            x, z = profile_points(arr, scope)
+            # if len(arr) != 0:
+            # z = moving_average(z, 20)
+            ax2.plot(x, z, c=color, alpha=0.7)
+
+        ax.set_title(f"Chromosome {chrom}")
+
+    # Create a custom legend outside the function
+    custom_legend = [
+        plt.Line2D([0], [0], color="k", lw=2, label="Average Ref. Peak"),
+        plt.Line2D([0], [0], color="m", lw=2, label="CRO"),
+        plt.Line2D([0], [0], color="r", lw=2, label="ORF"),
+        plt.Line2D([0], [0], color="b", lw=2, label="ORE"),
+        plt.Line2D([0], [0], color="y", lw=2, label="PXP"),
+    ]
+    fig.legend(
+        handles=custom_legend,
+        loc="lower center",
+        fancybox=True,
+        shadow=True,
+        fontsize=11,
+        ncol=5,
+    ).set_bbox_to_anchor((0.5, 0.0))
+    # Set x-axis label at the center of the left
+    fig.text(
+        0.5,
+        0.07,
+        "Distance from Reference Peak Midpoint",
+        ha="center",
+        va="center",
+        fontsize=12,
+    )
+
+    # Set y-axis label at the center of the bottom
+    fig.text(
+        0.02,
+        0.5,
+        "Frequency of Reference Peaks",
+        ha="center",
+        va="center",
+        rotation="vertical",
+        fontsize=12,
+    )
+
+    fig.text(
+        0.98,
+        0.5,
+        "Overlaps Counts",
+        ha="center",
+        va="center",
+        rotation="vertical",
+        fontsize=12,
+    )
+
+    # plt.subplots_adjust(bottom=0.4)
+    fig.suptitle(
+        "Per Chromosome Counts of Binding Overlaps Across Reference Binding Peak",
+    )
+    fig.tight_layout()
+    fig.subplots_adjust(left=0.08, right=0.92, top=0.9, bottom=0.12)
+    plt.savefig(filepath + "_chrom_ref_freq.png", dpi=dpi)
+    plt.close()
+
+
+def plot_average_ref_peak(data: dict, filepath: str, dpi: int = 300):
+    """With the x-axis being -scope to scope, plot all the frequency of the reference peaks over this domain.
+    normalize the y-axis and make the plot a line curve."""
+    scope = data["scope"]
+    num_peaks = data["num_ref_peaks"]
+    x = np.arange(-scope, scope + 1, 1)
+    y = data["ref"] / num_peaks
+    fig = plt.figure()
+    ax1 = fig.add_subplot(111)
+    ln1 = ax1.plot(x, y, label="Average Ref. Peak", c="k", alpha=0.7)
+
+    ax2 = ax1.twinx()
+    x, z = profile_points(data["full"], scope)
+    # if len(z) != 0:
+    #     z = moving_average(z, 20)
+    ln2 = ax2.plot(x, z, c="m", label="Complete Ref Overlap (CRO)", alpha=0.7)
+
+    x, z = profile_points(data["front"], scope)
+    # if len(z) != 0:
+    #     z = moving_average(z, 20)
+    ln3 = ax2.plot(x, z, c="r", label="Overlap Ref Front (ORF)", alpha=0.7)
+
+    x, z = profile_points(data["end"], scope)
+    # if len(z) != 0:
+    #     z = moving_average(z, 20)
+    ln4 = ax2.plot(x, z, c="b", label="Overlaps Ref End (ORE)", alpha=0.7)
+
+    x, z = profile_points(data["ext"], scope)
+    # if len(z) != 0:
+    #     z = moving_average(z, 20)
+    ln5 = ax2.plot(x, z, c="y", label="Proximal Peaks (PXP)", alpha=0.7)
+
+    lns = ln1 + ln2 + ln3 + ln4 + ln5
+    labs = [l.get_label() for l in lns]
+
+    plt.title("Counts of Binding Overlaps Over Average Reference Peak Profile")
+    plt.xlabel("Distance from Reference Peak Midpoint")
+    ax1.set_ylabel("Frequency of Reference Peaks")
+    ax2.set_ylabel("Overlaps Counts")
+
+    plt.legend(
+        lns,
+        labs,
+        loc="upper center",
+        bbox_to_anchor=(0.5, -0.1),
+        fancybox=True,
+        shadow=True,
+        fontsize=8,
+        ncol=3,
+    )
+    plt.tight_layout()
+    plt.savefig(filepath + "_ref_freq.png", dpi=dpi)
+    plt.close()
+
+
+# The plots of BindCompare.generate_all, in the order they were always drawn.
+ALL_PLOTS = [
+    overlap_distribution_barplot,
+    overlap_distribution_piechart,
+    plot_average_ref_peak,
+    plot_perchrom_ref_peak,
+    overlap_bar_totals,
+]
+
+
+def init_worker():
+    """Plot pool initializer. Workers only write files, so they render headless."""
+    matplotlib.use("Agg", force=True)
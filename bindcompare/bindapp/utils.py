@@ -1,4 +1,7 @@
+import hashlib
+import os
 import textwrap
+import numpy as np
 
 
 def process_gtf(gene_file):
@@ -25,6 +28,53 @@ def process_gtf(gene_file):
     return all_genes
 
 
+def file_digest(path, *options):
+    """Returns a sha1 hex digest of the file contents and the given option strings."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    for option in options:
+        digest.update(b"\0" + str(option).encode())
+    return digest.hexdigest()
+
+
+def options_digest(*options):
+    """Returns a sha1 hex digest of the given option strings."""
+    digest = hashlib.sha1()
+    for option in options:
+        digest.update(b"\0" + str(option).encode())
+    return digest.hexdigest()
+
+
+def file_stat(path):
+    """Returns the size and modification time (ns) of a file, a cheap check of
+    whether it changed."""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def user_cache_dir():
+    """Returns the per-user directory for prebuilt indexes.
+    $BINDCOMPARE_CACHE overrides the default of $XDG_CACHE_HOME/bindcompare."""
+    if os.environ.get("BINDCOMPARE_CACHE"):
+        return os.environ["BINDCOMPARE_CACHE"]
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "bindcompare")
+
+
+def expand_ranges(lo: np.ndarray, hi: np.ndarray):
+    """Flattens the half-open ranges [lo, hi) into one index array.
+    Also returns, for each flattened index, the position of the range it came from."""
+    counts = hi - lo
+    owner = np.repeat(np.arange(len(lo)), counts)
+    starts = np.cumsum(counts) - counts
+    flat = np.arange(counts.sum()) - np.repeat(starts - lo, counts)
+    return flat, owner
+
+
 def average_peak_size(processed_bed):
     total_sum, total_peaks = 0, 0
     for chrom in processed_bed:
@@ -2,8 +2,7 @@ import argparse
 from datetime import datetime
 import os
 
-from .bindapp import merge
-from .bindapp import downstream
+from .bindapp.options import ENGINES, PLOT_MODES
 
 
 def is_valid_file(parser, arg, name):
@@ -27,6 +26,26 @@ def is_valid_scope(parser, arg):
         parser.error(f"The value {arg} is not a valid scope!")
 
 
+def is_valid_scopes(parser, arg):
+    try:
+        scopes = [int(scope) for scope in arg.split(",") if scope.strip()]
+    except ValueError:
+        parser.error(f"The value {arg} is not a valid comma-separated list of scopes!")
+    if not scopes:
+        parser.error(f"The value {arg} does not list any scopes!")
+    return scopes
+
+
+def is_valid_threads(parser, arg):
+    try:
+        threads = int(arg)
+    except ValueError:
+        parser.error(f"The value {arg} is not a valid number of threads!")
+    if threads < 1:
+        parser.error(f"The number of threads must be at least 1, got {arg}!")
+    return threads
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="bindcompare: Reveal and analyze co-regulatory sites across two protein-binding datasets."
@@ -46,13 +65,18 @@ def main():
         type=lambda x: is_valid_file(parser, x, "overlayed BED"),
         help="The file path for your overlayed BED file.",
     )
-    parser.add_argument(
+    scope_group = parser.add_mutually_exclusive_group(required=True)
+    scope_group.add_argument(
         "-s",
         "--scope",
-        required=True,
         type=lambda x: is_valid_scope(parser, x),
         help="Nucleotides upstream and downstream from the ref peak's center that BC will search for peaks.",
     )
+    scope_group.add_argument(
+        "--scopes",
+        type=lambda x: is_valid_scopes(parser, x),
+        help="Comma-separated scopes (e.g. 250,500,1000) computed in one pass. Outputs go to OUT/scope_<scope>/.",
+    )
     parser.add_argument(
         "-n", "--name", required=True, help="Str name for this experiment."
     )
@@ -67,7 +91,12 @@ def main():
         "-g",
         "--gtf",
         default="None",
-        help="Gene GTF file in proper format.",
+        help="Gene GTF file (may be gzipped) in proper format, or 'dm6' for the bundled annotation.",
+    )
+    parser.add_argument(
+        "--gtf-feature",
+        default="gene",
+        help="GTF feature type (column 3) used for gene annotation, or 'all' for every row.",
     )
     parser.add_argument(
         "-f",
@@ -75,26 +104,79 @@ def main():
         default="None",
         help="Genome file corresponding to your BED Files.",
     )
+    parser.add_argument(
+        "--engine",
+        default="numpy",
+        choices=ENGINES,
+        help="Overlap engine. 'intervaltree' is the original per-peak search, kept for cross-checking.",
+    )
+    parser.add_argument(
+        "-t",
+        "--threads",
+        "--workers",
+        default=1,
+        type=lambda x: is_valid_threads(parser, x),
+        help="Number of worker processes. Chromosomes are compared in parallel.",
+    )
+    parser.add_argument(
+        "--cache",
+        default=None,
+        help="Directory for cached parsed BED files. Reused while the BED file is unchanged.",
+    )
+    parser.add_argument(
+        "--plots",
+        default="full",
+        choices=PLOT_MODES,
+        help="'full' renders 300 dpi plots, 'fast' low-resolution previews and 'none' skips plotting.",
+    )
 
     args = parser.parse_args()
 
+    # Imported once the arguments are valid, so that --help and errors return quickly.
+    from . import retrieve
+    from .bindapp import downstream, merge
+
+    args.gtf = retrieve.resolve_gtf(args.gtf)
     if args.gtf != "None" and not os.path.isfile(args.gtf):
         parser.error(f"Valid GTF file not provided.")
 
     if args.fasta != "None" and not os.path.isfile(args.fasta):
         parser.error(f"Valid FASTA file not provided.")
 
-    summary_output = os.path.join(args.out, f"{args.name}_summary.txt")
+    if args.scopes is not None and args.engine != "numpy":
+        parser.error("--scopes requires the numpy engine.")
 
     if not os.path.exists(args.out):
         os.makedirs(args.out, exist_ok=True)
 
-    with open(summary_output, "w") as summary_file:
-        merge.main(args.ref, args.exp, args.scope, args.name, f"{args.out}/", args.gtf)
+    if args.scopes is not None:
+        outdirs = [
+            merge.scope_dir(args.out, scope) for scope in sorted(set(args.scopes))
+        ]
+    else:
+        outdirs = [args.out]
+
+    tables = merge.main(
+        args.ref,
+        args.exp,
+        args.scope,
+        args.name,
+        f"{args.out}/",
+        args.gtf,
+        args.engine,
+        args.threads,
+        args.cache,
+        args.scopes,
+        args.gtf_feature,
+        args.plots,
+    )
 
-    with open(summary_output, "a") as summary_file:
+    for outdir, table in zip(outdirs, tables):
         downstream.downstream(
-            os.path.join(args.out, f"{args.name}_overlaps.csv"), args.fasta, args.out
+            os.path.join(outdir, f"{args.name}_overlaps.csv"),
+            args.fasta,
+            outdir,
+            table=table,
         )
 
     date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -1,9 +1,6 @@
 import os
-import re
 import sys
 import argparse
-import matplotlib.pyplot as plt
-from matplotlib_venn import venn2
 from collections import defaultdict
 
 
@@ -12,11 +9,15 @@ def extract_genes_from_summary(file_path):
     with open(file_path, "r") as file:
         for line in file:
             if line.startswith("List of All Genes:"):
-                genes.update(re.findall(r"\b\w+\b", next(file)))
+                genes.update(next(file, "").split())
     return genes
 
 
 def create_summary_file(genes_folder1, genes_folder2, prefix1, prefix2):
+    # Imported here so that the GUI can use verify_summary_file without matplotlib.
+    import matplotlib.pyplot as plt
+    from matplotlib_venn import venn2
+
     # Create Venn diagram
     venn = venn2([genes_folder1, genes_folder2], set_labels=(prefix1, prefix2))
 
@@ -59,6 +60,72 @@ def create_summary_file(genes_folder1, genes_folder2, prefix1, prefix2):
     return summary_file_name
 
 
+def gene_matrix(gene_sets: list):
+    """Returns the sorted gene names and the sparse (experiments x genes) matrix with
+    a 1 wherever an experiment found a gene."""
+    import numpy as np
+    from scipy import sparse
+
+    sizes = [len(genes) for genes in gene_sets]
+    names = np.array([gene for genes in gene_sets for gene in genes], dtype=str)
+    genes, columns = np.unique(names, return_inverse=True)
+    rows = np.repeat(np.arange(len(gene_sets)), sizes)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int64), (rows, columns.ravel())),
+        shape=(len(gene_sets), len(genes)),
+    )
+    return genes, matrix
+
+
+def create_nway_summary(gene_sets: list, prefixes: list, name: str):
+    """Compares any number of experiments at once: the pairwise intersection sizes
+    (one sparse product of the gene matrix), the Jaccard matrix, and the genes
+    exclusive to each experiment or found by all of them."""
+    import matplotlib.pyplot as plt
+    import numpy as np
+    import pandas as pd
+
+    genes, matrix = gene_matrix(gene_sets)
+    intersections = (matrix @ matrix.T).toarray()
+    sizes = np.diag(intersections)
+    unions = sizes[:, None] + sizes[None, :] - intersections
+    jaccard = np.divide(
+        intersections, unions, out=np.zeros(unions.shape), where=unions > 0
+    )
+
+    pd.DataFrame(jaccard, index=prefixes, columns=prefixes).to_csv(
+        f"{name}_jaccard.csv"
+    )
+    pd.DataFrame(intersections, index=prefixes, columns=prefixes).to_csv(
+        f"{name}_intersections.csv"
+    )
+
+    # Number of experiments that found each gene.
+    found_by = np.asarray(matrix.sum(axis=0)).ravel()
+    summary_file_name = f"{name}_summary.txt"
+    with open(summary_file_name, "w") as summary_file:
+        summary_file.write(
+            f"Genes in All {len(prefixes)} Samples: {' '.join(genes[found_by == len(prefixes)])}\n"
+        )
+        for i, prefix in enumerate(prefixes):
+            row = np.sort(matrix.indices[matrix.indptr[i] : matrix.indptr[i + 1]])
+            exclusive = genes[row[found_by[row] == 1]]
+            summary_file.write(f"Genes Exclusive to {prefix}: {' '.join(exclusive)}\n")
+
+    size = max(6, len(prefixes) // 3 + 4)
+    plt.figure(figsize=(size + 2, size))
+    plt.imshow(jaccard, cmap="YlOrRd", vmin=0, vmax=1, interpolation="nearest")
+    plt.xticks(np.arange(len(prefixes)), prefixes, rotation=45, ha="right")
+    plt.yticks(np.arange(len(prefixes)), prefixes, rotation=45, va="center")
+    plt.colorbar()
+    plt.title("Pair-wise Jaccard Similarity of Overlapped Genes", fontsize=16)
+    plt.tight_layout()
+    plt.savefig(f"{name}_jaccard.png", dpi=300)
+    plt.close()
+
+    return summary_file_name
+
+
 def verify_summary_file(folder_path):
     summary_files = []
     for root, dirs, files in os.walk(folder_path):
@@ -73,26 +140,67 @@ def verify_summary_file(folder_path):
     return summary_files
 
 
+def compare_many(parser, folders: list, name: str):
+    """Runs the N-way comparison of the summary gene lists of the given folders."""
+    if len(folders) < 2:
+        parser.error("-d/--bindpaths needs at least two directories.")
+    gene_sets, prefixes = [], []
+    for folder in folders:
+        summary_files = verify_summary_file(folder)
+        if len(summary_files) != 1:
+            print(f"Error: expected one summary file with genes in {folder}.")
+            sys.exit(1)
+        gene_sets.append(extract_genes_from_summary(summary_files[0]))
+        prefixes.append(os.path.basename(summary_files[0]).split("_summary.txt")[0])
+    if len(set(prefixes)) < len(prefixes):
+        # Runs named alike are told apart by their directories.
+        prefixes = [os.path.basename(os.path.normpath(f)) for f in folders]
+
+    summary_file_name = create_nway_summary(gene_sets, prefixes, name)
+    print(f"Comparison summary file '{summary_file_name}' created successfully.")
+
+
 def main():
     parser = argparse.ArgumentParser(
-        description="comparexp: Compare two bindcompare experiments."
+        description="comparexp: Compare bindcompare experiments."
     )
 
     parser.add_argument(
         "-a",
         "--bindpath_1",
         help="Path to the first bindcompare Output Directory.",
-        required=True,
+        required=False,
     )
     parser.add_argument(
         "-b",
         "--bindpath_2",
         help="Path to the second bindcompare Output Directory.",
-        required=True,
+        required=False,
+    )
+    parser.add_argument(
+        "-d",
+        "--bindpaths",
+        nargs="+",
+        help="Paths to any number of bindcompare Output Directories, compared all at once.",
+        required=False,
+    )
+    parser.add_argument(
+        "-n",
+        "--name",
+        default="comparexp",
+        help="Prefix for the outputs of -d/--bindpaths. Default 'comparexp'.",
     )
 
     args = parser.parse_args()
 
+    if args.bindpaths is not None:
+        if args.bindpath_1 or args.bindpath_2:
+            parser.error("Use either -a/-b or -d/--bindpaths.")
+        compare_many(parser, args.bindpaths, args.name)
+        return
+    if not (args.bindpath_1 and args.bindpath_2):
+        parser.error("Provide -a and -b, or -d with two or more directories.")
+
     folder1_path = args.bindpath_1
     folder2_path = args.bindpath_2
 
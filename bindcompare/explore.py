@@ -1,11 +1,18 @@
 import argparse
+import hashlib
+import json
+import os
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 
-from multiprocessing import Process, Manager, Pool, cpu_count
+from .bindapp.options import EXPLORE_ENGINES
+from .bindapp.utils import expand_ranges, file_digest, user_cache_dir
+
+from multiprocessing import Pool, cpu_count
 import sys
 
+SKETCH_VERSION = "bin-sketch-v3;max_chrom_len=5"
+STATE_VERSION = "explore-state-v2;max_chrom_len=5"
+
 
 class BedProcessor:
     def __init__(self, bed_file):
@@ -14,6 +21,13 @@ class BedProcessor:
         self.global_dict = {}
         self.counts = {}
         self.total_sites = 0
+        self.bits = None
+        # Bin size -> (bottom-k sketch, entries in each sketched bin, number of
+        # distinct occupied bins).
+        self.sketches = {}
+        self.digest = None
+        # {chrom: (starts, stops)} sorted by position, read once for all bin sizes.
+        self.sites = None
 
     def get_name_from_bed(self):
         form = self.bed_file.find(".bed")
@@ -27,7 +41,12 @@ class BedProcessor:
             name = self.bed_file[0:form]
         return name
 
-    def process_bed(self, bin_size: int):
+    def read_sites(self):
+        """Returns {chrom: (starts, stops)} of the sites on the kept chromosomes,
+        sorted by position. The file is only read the first time."""
+        if self.sites is not None:
+            return self.sites
+        sites = {}
         with open(self.bed_file) as bed_obj:
             for line in bed_obj:
                 bed_row = line.split()
@@ -43,61 +62,514 @@ class BedProcessor:
                 else:
                     continue
 
-                bin_id = int(start / bin_size)
-                end_bin_id = int(stop / bin_size)
-                if chrom not in self.global_dict:
-                    self.global_dict[chrom] = []
-                    self.counts[chrom] = 0
-                self.global_dict[chrom].append(bin_id)
-                if end_bin_id != bin_id:
-                    self.global_dict[chrom].append(bin_id)
-                self.counts[chrom] += 1
-
-        total_sites = 0
-        for chrom in self.global_dict:
+                if chrom not in sites:
+                    sites[chrom] = ([], [])
+                sites[chrom][0].append(start)
+                sites[chrom][1].append(stop)
+
+        self.sites = {}
+        for chrom, (starts, stops) in sites.items():
+            starts = np.array(starts, dtype=np.int64)
+            stops = np.array(stops, dtype=np.int64)
+            order = np.lexsort((stops, starts))
+            self.sites[chrom] = (starts[order], stops[order])
+        return self.sites
+
+    def pack_sites(self):
+        """Returns the sites as compact arrays for transfer between processes: the
+        chromosome names, the number of sites of each, and all starts and stops."""
+        chroms = list(self.sites)
+        lengths = np.array([len(self.sites[c][0]) for c in chroms], dtype=np.int64)
+        starts = [self.sites[c][0] for c in chroms]
+        stops = [self.sites[c][1] for c in chroms]
+        if not chroms:
+            return chroms, lengths, np.zeros(0, np.int64), np.zeros(0, np.int64)
+        return chroms, lengths, np.concatenate(starts), np.concatenate(stops)
+
+    def unpack_sites(self, packed):
+        """Restores the sites from the arrays of pack_sites()."""
+        chroms, lengths, starts, stops = packed
+        bounds = np.cumsum(lengths)[:-1]
+        self.sites = dict(
+            zip(chroms, zip(np.split(starts, bounds), np.split(stops, bounds)))
+        )
+
+    def process_bed(self, bin_size: int):
+        self.global_dict, self.counts = {}, {}
+        for chrom, (starts, stops) in self.read_sites().items():
+            bin_ids = starts // bin_size
+            # BED ends are exclusive, as in process_bits.
+            end_bin_ids = (np.maximum(stops, starts + 1) - 1) // bin_size
+            # A site crossing a bin boundary is also counted in its end bin.
+            self.global_dict[chrom] = np.concatenate(
+                [bin_ids, end_bin_ids[end_bin_ids != bin_ids]]
+            )
             self.counts[chrom] = len(self.global_dict[chrom])
-            total_sites += self.counts[chrom]
-            self.global_dict[chrom] = np.array(self.global_dict[chrom])
 
-        self.total_sites = total_sites
+        self.total_sites = sum(self.counts.values())
+
+    def process_bits(self, bin_size: int, lengths: dict):
+        """Marks every bin covered by a site in one packed bit array over the genome
+        laid out by genome_bins. Sites on chromosomes missing from lengths are skipped.
+        """
+        offsets, total = genome_bins(lengths, bin_size)
+        bits = np.zeros(total, dtype=bool)
+        skipped = 0
+        for chrom, (starts, stops) in self.read_sites().items():
+            if chrom not in offsets:
+                skipped += len(starts)
+                continue
+            last_bin = (lengths[chrom] - 1) // bin_size
+            keep = starts < lengths[chrom]
+            first = starts[keep] // bin_size
+            # BED ends are exclusive; an empty site still marks its start bin.
+            last = np.minimum(
+                (np.maximum(stops[keep], starts[keep] + 1) - 1) // bin_size, last_bin
+            )
+            covered, _ = expand_ranges(first, last + 1)
+            bits[offsets[chrom] + covered] = True
+        if skipped:
+            print(
+                f"{self.name}: skipped {skipped} sites on chromosomes not in the .fai."
+            )
+        self.bits = np.packbits(bits)
+        self.total_sites = popcount(self.bits)
+
+    def pack(self):
+        """Returns the binned sites as compact arrays for transfer between processes:
+        the chromosome names, the number of bins of each, and all bins concatenated."""
+        chroms = list(self.global_dict)
+        lengths = np.array([len(self.global_dict[c]) for c in chroms], dtype=np.int64)
+        bins = [self.global_dict[c] for c in chroms]
+        return chroms, lengths, np.concatenate(bins) if bins else np.zeros(0, np.int64)
+
+    def unpack(self, packed):
+        """Restores the binned sites from the arrays of pack()."""
+        chroms, lengths, bins = packed
+        self.global_dict = dict(zip(chroms, np.split(bins, np.cumsum(lengths)[:-1])))
+        self.counts = dict(zip(chroms, lengths.tolist()))
+        self.total_sites = int(lengths.sum())
+
+    def build_sketch(self, bin_size: int, size: int):
+        """Returns a bottom-k sketch of the set of occupied bins: the size smallest bin
+        hashes, the number of entries in each of those bins, and the exact number of
+        distinct occupied bins."""
+        self.process_bed(bin_size=bin_size)
+        hashes = [bin_hashes(chrom, bins) for chrom, bins in self.global_dict.items()]
+        self.global_dict = {}
+        if not hashes:
+            return np.zeros(0, np.uint64), np.zeros(0, np.uint64), 0
+        hashes, counts = np.unique(np.concatenate(hashes), return_counts=True)
+        return hashes[:size], counts[:size].astype(np.uint64), len(hashes)
+
+    def sketch_path(self, cache_dir: str, bin_size: int, size: int):
+        """Returns the sketch path prefix, keyed by file content and sketch options."""
+        digest = file_digest(self.bed_file, SKETCH_VERSION, bin_size, size)
+        name = f"{os.path.basename(self.bed_file)}.{digest[:20]}.sketch"
+        return os.path.join(cache_dir, name)
+
+    def load_sketch(self, cache_dir: str, bin_size: int, size: int):
+        """Loads a saved sketch, its bin entry counts and its bin count. Returns None if
+        there is none for the file contents."""
+        prefix = self.sketch_path(cache_dir, bin_size, size)
+        if not os.path.isfile(prefix + ".json"):
+            return None
+        with open(prefix + ".json") as handle:
+            table = json.load(handle)
+        sketch, counts = np.load(prefix + ".npy")
+        return sketch, counts, table["cardinality"]
+
+    def save_sketch(
+        self, cache_dir: str, bin_size: int, size: int, sketch, counts, cardinality
+    ):
+        from .bindapp.merge_class import write_cache
+
+        table = {
+            "bedfile": os.path.abspath(self.bed_file),
+            "bin_size": bin_size,
+            "cardinality": cardinality,
+        }
+        try:
+            prefix = self.sketch_path(cache_dir, bin_size, size)
+            write_cache(prefix, np.vstack([sketch, counts]), table)
+        except OSError as e:
+            print(f"Unable to write sketch in {cache_dir}: {e}")
 
     def __reduce__(self):
         return (self.__class__, (self.bed_file,))
 
 
+def fai_lengths(fai_file: str):
+    """Returns {chrom: length} from a .fai index, in file order, with the chromosome
+    names cleaned as in BedProcessor.read_sites."""
+    lengths = {}
+    with open(fai_file) as table:
+        for line in table:
+            fields = line.split("\t")
+            if len(fields) < 2:
+                continue
+            chrom = fields[0].split()[0]
+            if chrom[0:3] == "chr" or chrom[0:3] == "Chr":
+                chrom = chrom[3:]
+            if chrom[0:2] == "Un" or (len(chrom) > 5) or (chrom == "chr"):
+                continue
+            lengths[chrom] = int(fields[1])
+    return lengths
+
+
+def genome_bins(lengths: dict, bin_size: int):
+    """Lays the bins of the chromosomes end to end. Returns the first bin of each
+    chromosome and the total number of bins, padded to whole 64-bit words."""
+    offsets, total = {}, 0
+    for chrom, length in lengths.items():
+        offsets[chrom] = total
+        total += -(-length // bin_size)
+    return offsets, -(-total // 64) * 64
+
+
+def popcount(bits: np.ndarray, axis=None):
+    """Counts the set bits of a packed uint8 bit array (along axis)."""
+    if hasattr(np, "bitwise_count"):
+        if bits.shape[-1] % 8 == 0:
+            bits = bits.view(np.uint64)
+        return np.bitwise_count(bits).sum(axis=axis, dtype=np.int64)
+    return POPCOUNT_TABLE[bits].sum(axis=axis, dtype=np.int64)
+
+
+# Set bits of every byte value, for numpy releases without np.bitwise_count.
+POPCOUNT_TABLE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(1)
+
+
+def bin_hashes(chrom: str, bins: np.ndarray):
+    """Hashes (chrom, bin) pairs to 64-bit values with the splitmix64 finalizer.
+    The hashes only depend on the pair, so sketches of different runs combine."""
+    seed = hashlib.blake2b(chrom.encode(), digest_size=8).digest()
+    z = bins.astype(np.uint64) + np.uint64(int.from_bytes(seed, "little"))
+    z = z + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def sketch_bed(args):
+    """Pool worker: loads or builds (and saves) the sketches of one BED file at every
+    bin size. The file is read at most once."""
+    processor, bin_sizes, size, cache_dir = args
+    sketches = {}
+    for bin_size in bin_sizes:
+        sketch = processor.load_sketch(cache_dir, bin_size, size)
+        if sketch is None:
+            sketch = processor.build_sketch(bin_size, size)
+            processor.save_sketch(cache_dir, bin_size, size, *sketch)
+        sketches[bin_size] = sketch
+    return sketches
+
+
+def read_bed(processor):
+    """Pool worker: reads one BED file and returns its packed sites."""
+    processor.read_sites()
+    return processor.pack_sites()
+
+
+def sparse_shared(occupancy, rows: np.ndarray, columns: np.ndarray):
+    """For each file in rows, the number of entries of each file in columns that fall
+    in a bin occupied by the row's file."""
+    occupied = (occupancy[rows] > 0).astype(np.int64)
+    return (occupied @ occupancy[columns].T).toarray()
+
+
+def bitset_shared(bits: np.ndarray, rows: np.ndarray, columns: np.ndarray):
+    """For each file in rows, the number of bins set in both its bit array and the
+    bit array of each file in columns, by bitwise AND and popcount."""
+    shared = np.zeros((len(rows), len(columns)), dtype=np.int64)
+    # One row-sized buffer, so memory stays that of a single bit array.
+    both = np.empty(bits.shape[1], dtype=bits.dtype)
+    for r, i in enumerate(rows):
+        for c, j in enumerate(columns):
+            np.bitwise_and(bits[i], bits[j], out=both)
+            shared[r, c] = popcount(both)
+    return shared
+
+
+# The occupancy matrix (or bit arrays) of the running bindexplore, set once in each
+# worker.
+shared_occupancy = None
+
+
+def init_overlap_worker(occupancy):
+    global shared_occupancy
+    shared_occupancy = occupancy
+
+
+def overlap_rows(args):
+    """Pool worker: a block of the shared counts."""
+    engine, rows, columns = args
+    if engine == "bitset":
+        return bitset_shared(shared_occupancy, rows, columns)
+    return sparse_shared(shared_occupancy, rows, columns)
+
+
 class ProcessManager:
-    def __init__(self, bed_files: list, name: str) -> None:
-        self.manager = Manager()
-        self.global_dict = self.manager.dict()
-        self.processors = [BedProcessor(bf) for bf in bed_files]
+    def __init__(
+        self, bed_files: list, name: str, threads: int = 1, lengths: dict = None
+    ) -> None:
+        # Processors may be shared between managers, so files are read only once.
+        self.processors = [
+            bf if isinstance(bf, BedProcessor) else BedProcessor(bf) for bf in bed_files
+        ]
         self.names = [bf.name for bf in self.processors]
         self.N = len(self.names)
         self.correl = np.ones((self.N, self.N))
+        # Standard errors of the approximate matrix; None for exact matrices.
+        self.stderr = None
+        self.occupancy = None
         self.identity = name
+        self.threads = threads
+        # Chromosome lengths of the bitset engine; None for the sparse engine.
+        self.lengths = lengths
+        self.engine = "sparse" if lengths is None else "bitset"
+        # Files whose profiles and matrix cells come from a previous run.
+        self.known = np.zeros(self.N, dtype=bool)
+
+    def read_bed_files(self, processors: list):
+        """Reads the sites of the processors that have not been read yet, in a worker
+        pool when there are several threads."""
+        pending = [p for p in processors if p.sites is None]
+        threads = min(self.threads, len(pending))
+        if threads <= 1:
+            for processor in pending:
+                processor.read_sites()
+            return
+        with Pool(threads) as pool:
+            for processor, packed in zip(pending, pool.map(read_bed, pending)):
+                processor.unpack_sites(packed)
 
     def process_bed_files(self, bin_size: int):
-        for processor in self.processors:
-            processor.process_bed(bin_size=bin_size)
-
-    def overlap(self, args):
-        i, j = args
-        a = self.processors[i].global_dict
-        b = self.processors[j].global_dict
-        self.correl[i, j] = (
-            sum(
-                [
-                    np.count_nonzero(np.isin(b[chrom], a[chrom])) if chrom in a else 0
-                    for chrom in b
-                ]
+        """Bins every file not restored from a previous run."""
+        pending = [p for p, known in zip(self.processors, self.known) if not known]
+        self.read_bed_files(pending)
+        for processor in pending:
+            if self.lengths is None:
+                processor.process_bed(bin_size=bin_size)
+            else:
+                processor.process_bits(bin_size, self.lengths)
+
+    def sketch_bed_files(self, bin_sizes: list, size: int, cache_dir: str):
+        """Loads or builds the sketches of every file at every bin size, in a worker
+        pool when there are several threads."""
+        tasks = [(p, bin_sizes, size, cache_dir) for p in self.processors]
+        threads = min(self.threads, self.N)
+        if threads <= 1:
+            sketches = [sketch_bed(task) for task in tasks]
+        else:
+            with Pool(threads) as pool:
+                sketches = pool.map(sketch_bed, tasks)
+        for processor, sketch in zip(self.processors, sketches):
+            processor.sketches.update(sketch)
+
+    def estimate_overlaps(self, bin_size: int):
+        """Estimates correl[i, j], the fraction of the entries of file j that fall in a
+        bin occupied by file i, from the bottom-k sketches, with its standard error.
+
+        For a pair, both sketches hold every bin of their files up to the lower of
+        their largest hashes t. The bins of file j up to t are a random sample of its
+        bins; the cell is the ratio of the entries of j in the sampled bins that file
+        i also occupies to the entries of j in all sampled bins."""
+        from scipy import sparse
+
+        sketches, counts, cardinalities = zip(
+            *(p.sketches[bin_size] for p in self.processors)
+        )
+        hashes, columns = np.unique(np.concatenate(sketches), return_inverse=True)
+        sizes = [len(sketch) for sketch in sketches]
+        rows = np.repeat(np.arange(self.N), sizes)
+        members = sparse.csc_matrix(
+            (np.ones(len(rows)), (rows, columns.ravel())),
+            shape=(self.N, len(hashes)),
+        )
+        columns = np.split(columns.ravel(), np.cumsum(sizes)[:-1])
+
+        # A sketch of a whole set (no more bins than the sketch size) has no bound.
+        tops = np.array(
+            [
+                sketch[-1] if len(sketch) < n else np.iinfo(np.uint64).max
+                for sketch, n in zip(sketches, cardinalities)
+            ],
+            dtype=np.uint64,
+        )
+        self.correl = np.zeros((self.N, self.N))
+        self.stderr = np.zeros((self.N, self.N))
+        for j in range(self.N):
+            # Sampled bins of file j for each row file i.
+            m = np.searchsorted(sketches[j], np.minimum(tops, tops[j]), side="right")
+            x = counts[j].astype(np.float64)
+            occupied = members[:, columns[j]].toarray()
+            # Running sums over the sketch of j, with a leading zero.
+            x_sum, x2_sum = (np.concatenate([[0], np.cumsum(v)]) for v in (x, x * x))
+            y_sum, y2_sum = (
+                np.pad(np.cumsum(occupied * v, axis=1), ((0, 0), (1, 0)))
+                for v in (x, x * x)
             )
-            / self.processors[j].total_sites
+            rows = np.arange(self.N)
+            total, shared = x_sum[m], y_sum[rows, m]
+            ratio = np.divide(shared, total, out=np.zeros(self.N), where=total > 0)
+            # Ratio estimator variance, sampling m of the n bins without replacement.
+            # Occupancy is 0 or 1, so the sum of (y - ratio x)^2 reduces to these sums.
+            residual = (1 - 2 * ratio) * y2_sum[rows, m] + ratio**2 * x2_sum[m]
+            correction = 1 - m / max(cardinalities[j], 1)
+            variance = np.divide(
+                correction * np.clip(residual, 0, None) * m,
+                np.maximum(m - 1, 1) * total**2,
+                out=np.zeros(self.N),
+                where=total > 0,
+            )
+            self.correl[:, j] = ratio
+            self.stderr[:, j] = np.sqrt(variance)
+        np.fill_diagonal(self.correl, 1.0)
+        np.fill_diagonal(self.stderr, 0.0)
+
+    def build_occupancy(self):
+        """Encodes the bin IDs of every file into one global bin space: chromosomes are
+        laid end to end, and the occupancy is a sparse (files x bins) matrix holding the
+        number of entries of each file in each bin."""
+        from scipy import sparse
+
+        chroms = sorted({chrom for p in self.processors for chrom in p.global_dict})
+        offsets, offset = {}, 0
+        for chrom in chroms:
+            offsets[chrom] = offset
+            offset += 1 + max(
+                int(p.global_dict[chrom].max())
+                for p in self.processors
+                if chrom in p.global_dict
+            )
+        rows, columns = [], []
+        for row, processor in enumerate(self.processors):
+            for chrom, bins in processor.global_dict.items():
+                rows.append(np.full(len(bins), row, dtype=np.int64))
+                columns.append(offsets[chrom] + bins)
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        columns = np.concatenate(columns) if columns else np.zeros(0, dtype=np.int64)
+        # Repeated (row, column) entries are summed, which keeps the multiplicities.
+        self.occupancy = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int64), (rows, columns)),
+            shape=(self.N, offset),
         )
-        self.correl[i, j]
+
+    def compute_overlaps(self):
+        """Fills the matrix with correl[i, j], the fraction of the entries of file j
+        that fall in a bin occupied by file i. The sparse engine takes one sparse
+        product; the bitset engine counts the bins set in both bit arrays. Only the
+        rows and columns of files not known from a previous run are computed."""
+        if self.engine == "bitset":
+            self.occupancy = np.vstack([p.bits for p in self.processors])
+            shared_counts = bitset_shared
+        else:
+            self.build_occupancy()
+            shared_counts = sparse_shared
+        new, old = np.flatnonzero(~self.known), np.flatnonzero(self.known)
+        threads = max(1, min(self.threads, len(new)))
+        blocks = [(rows, np.arange(self.N)) for rows in np.array_split(new, threads)]
+        if len(new):
+            blocks += [(rows, new) for rows in np.array_split(old, threads)]
+        blocks = [(rows, columns) for rows, columns in blocks if len(rows)]
+        if threads <= 1:
+            counts = [shared_counts(self.occupancy, *block) for block in blocks]
+        else:
+            with Pool(
+                threads, initializer=init_overlap_worker, initargs=(self.occupancy,)
+            ) as pool:
+                tasks = [(self.engine, rows, columns) for rows, columns in blocks]
+                counts = pool.map(overlap_rows, tasks)
+        totals = np.array([p.total_sites for p in self.processors])
+        for (rows, columns), shared in zip(blocks, counts):
+            self.correl[np.ix_(rows, columns)] = shared / totals[columns]
+
+    def state_table(self, bin_size: int):
+        """Returns the options a saved run must match to be updated."""
+        return {"engine": self.engine, "bin_size": bin_size, "lengths": self.lengths}
+
+    def save_state(self, bin_size: int):
+        """Saves the per-file bin profiles and the matrix next to the CSV, in
+        {name}_explore.npz, so that a later run can add files to them."""
+        path = f"{self.identity}_explore.npz"
+        files = []
+        for p in self.processors:
+            if p.digest is None:
+                p.digest = file_digest(p.bed_file)
+            files.append({"bed_file": os.path.abspath(p.bed_file), "digest": p.digest})
+        arrays = {"correl": self.correl}
+        if self.engine == "bitset":
+            arrays["bits"] = self.occupancy
+        else:
+            packed = [p.pack() for p in self.processors]
+            for entry, (chroms, _, _) in zip(files, packed):
+                entry["chroms"] = chroms
+            arrays["lengths"] = np.concatenate([lengths for _, lengths, _ in packed])
+            arrays["bins"] = np.concatenate([bins for _, _, bins in packed])
+        table = dict(self.state_table(bin_size), version=STATE_VERSION, files=files)
+        arrays["table"] = np.array(json.dumps(table))
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as handle:
+                np.savez(handle, **arrays)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Unable to save the bindexplore state {path}: {e}")
+
+    def update_from_state(self, bin_size: int):
+        """Restores the files, profiles and matrix cells of the run saved in
+        {name}_explore.npz. The files of this run are added to them: a file saved
+        before with the same contents is reused, a changed file is binned again.
+        Returns False if there is no saved run for the same options."""
+        path = f"{self.identity}_explore.npz"
+        if not os.path.isfile(path):
+            return False
+        with np.load(path) as saved:
+            table = json.loads(str(saved["table"]))
+            if table.get("version") != STATE_VERSION or any(
+                table[key] != value for key, value in self.state_table(bin_size).items()
+            ):
+                print(f"{path} was saved with other options; starting from scratch.")
+                return False
+            arrays = {key: saved[key] for key in saved.files}
+
+        given = {os.path.abspath(p.bed_file): p for p in self.processors}
+        for p in self.processors:
+            p.digest = file_digest(p.bed_file)
+        restored, kept = [], []
+        bins_at, lengths_at = 0, 0
+        for i, entry in enumerate(table["files"]):
+            if self.engine == "sparse":
+                n = len(entry["chroms"])
+                lengths = arrays["lengths"][lengths_at : lengths_at + n]
+                bins = arrays["bins"][bins_at : bins_at + lengths.sum()]
+                lengths_at, bins_at = lengths_at + n, bins_at + lengths.sum()
+            current = given.get(entry["bed_file"])
+            if current is not None and current.digest != entry["digest"]:
+                continue
+            processor = current or BedProcessor(entry["bed_file"])
+            processor.digest = entry["digest"]
+            if self.engine == "sparse":
+                processor.unpack((entry["chroms"], lengths, bins))
+            else:
+                processor.bits = arrays["bits"][i]
+                processor.total_sites = popcount(processor.bits)
+            restored.append(processor)
+            kept.append(i)
+
+        added = [p for p in self.processors if not any(p is r for r in restored)]
+        self.processors = restored + added
+        self.names = [p.name for p in self.processors]
+        self.N = len(self.processors)
+        self.correl = np.ones((self.N, self.N))
+        self.correl[: len(kept), : len(kept)] = arrays["correl"][np.ix_(kept, kept)]
+        self.known = np.arange(self.N) < len(kept)
+        print(f"Reusing {len(kept)} files from {path}; adding {len(added)}.")
+        return True
 
     def plot_correlation_matrix(self, cmap: str):
-        indices = [(i, j) for i in range(self.N) for j in range(self.N)]
-        for index_pair in indices:
-            self.overlap(index_pair)
+        import matplotlib.pyplot as plt
 
         plt.figure(figsize=(10, 8))
 
@@ -119,10 +591,16 @@ class ProcessManager:
         plt.tight_layout()
 
         plt.savefig(f"{self.identity}_explore.png")
+        plt.close()
 
     def generate_csv_matrix(self):
+        import pandas as pd
+
         df = pd.DataFrame(data=self.correl, index=self.names, columns=self.names)
         df.to_csv(f"{self.identity}_explore.csv")
+        if self.stderr is not None:
+            df = pd.DataFrame(data=self.stderr, index=self.names, columns=self.names)
+            df.to_csv(f"{self.identity}_explore_stderr.csv")
 
 
 def main():
@@ -130,12 +608,17 @@ def main():
         description="bindexplore: Identify candidate co-regulators."
     )
 
-    parser.add_argument(
+    scope_group = parser.add_mutually_exclusive_group(required=True)
+    scope_group.add_argument(
         "-s",
         "--scope",
         type=int,
         help="Size to bin binding sites across genome.",
-        required=True,
+    )
+    scope_group.add_argument(
+        "--scopes",
+        type=str,
+        help="Comma-separated bin sizes (e.g. 100,1000,10000) computed from one read of each BED. Outputs are prefixed NAME_<scope>.",
     )
     parser.add_argument(
         "-b",
@@ -159,20 +642,115 @@ def main():
         default="YlOrRd",
         required=False,
     )
+    parser.add_argument(
+        "-t",
+        "--threads",
+        type=int,
+        help="Number of worker processes for reading BED files. Default: all CPUs.",
+        default=cpu_count(),
+        required=False,
+    )
+    parser.add_argument(
+        "--engine",
+        choices=EXPLORE_ENGINES,
+        default="sparse",
+        help="'sparse' counts every site in its start and end bins; 'bitset' marks every bin a site covers and needs --fai.",
+    )
+    parser.add_argument(
+        "--fai",
+        type=str,
+        help="FASTA index (.fai) giving the chromosome lengths for the bitset engine, e.g. dm6.fa.fai.",
+        required=False,
+    )
+    parser.add_argument(
+        "--approximate",
+        action="store_true",
+        help="Estimate the matrix from fixed-size MinHash sketches of each file's bins.",
+    )
+    parser.add_argument(
+        "--sketch-size",
+        type=int,
+        default=1024,
+        help="Number of bin hashes kept per sketch with --approximate. Default 1024.",
+    )
+    parser.add_argument(
+        "--cache",
+        type=str,
+        default=None,
+        help="Directory for the saved sketches. Default: the per-user cache directory.",
+    )
+    parser.add_argument(
+        "-u",
+        "--update",
+        action="store_true",
+        help="Add the BED files to the matrix saved by a previous run with the same name, computing only the new rows and columns.",
+    )
 
     args = parser.parse_args()
 
-    scope = args.scope
     beds = args.beds
     name = args.name
     cmap = args.color_map
 
-    if len(beds) < 2:
+    if len(beds) < 2 and not args.update:
         print("\nError: Minimum of 2 BED files required.\n")
         parser.print_usage()
         sys.exit(1)
+    if args.scopes is not None:
+        try:
+            scopes = [int(scope) for scope in args.scopes.split(",") if scope.strip()]
+        except ValueError:
+            parser.error(f"The value {args.scopes} is not a valid list of scopes!")
+    else:
+        scopes = [args.scope]
+    if not scopes or min(scopes) < 1:
+        parser.error("Bin sizes must be at least 1.")
+    scopes = list(dict.fromkeys(scopes))
+    if args.threads < 1:
+        parser.error(f"The number of threads must be at least 1, got {args.threads}!")
+
+    if args.approximate and args.engine != "sparse":
+        parser.error("--approximate sketches the bins of the sparse engine.")
+    if args.approximate and args.update:
+        parser.error("--approximate always reuses the saved sketches; drop --update.")
+    if args.sketch_size < 1:
+        parser.error(f"The sketch size must be at least 1, got {args.sketch_size}!")
 
-    pm = ProcessManager(bed_files=beds, name=name)
-    pm.process_bed_files(bin_size=scope)
-    pm.plot_correlation_matrix(cmap=cmap)
-    pm.generate_csv_matrix()
+    lengths = None
+    if args.engine == "bitset":
+        if args.fai is None:
+            parser.error("The bitset engine requires --fai.")
+        if not os.path.isfile(args.fai):
+            parser.error(f"The FASTA index {args.fai} does not exist!")
+        lengths = fai_lengths(args.fai)
+
+    # Files are read (or sketched) once and shared by the managers of every scope.
+    processors = [BedProcessor(bed) for bed in beds]
+    if args.approximate:
+        cache_dir = args.cache or user_cache_dir()
+        ProcessManager(processors, name, args.threads).sketch_bed_files(
+            scopes, args.sketch_size, cache_dir
+        )
+
+    for scope in scopes:
+        identity = name if args.scopes is None else f"{name}_{scope}"
+        pm = ProcessManager(
+            bed_files=processors, name=identity, threads=args.threads, lengths=lengths
+        )
+        if args.approximate:
+            pm.estimate_overlaps(bin_size=scope)
+            print(
+                f"Approximate matrix: largest standard error {pm.stderr.max():.4f}, "
+                f"written to {identity}_explore_stderr.csv."
+            )
+        else:
+            if args.update:
+                pm.update_from_state(bin_size=scope)
+            if pm.N < 2:
+                print("\nError: Minimum of 2 BED files required.\n")
+                sys.exit(1)
+            pm.process_bed_files(bin_size=scope)
+            pm.compute_overlaps()
+            pm.save_state(bin_size=scope)
+        pm.plot_correlation_matrix(cmap=cmap)
+        pm.generate_csv_matrix()
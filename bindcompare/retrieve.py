@@ -2,6 +2,25 @@ import gzip
 import shutil
 import os
 
+from .bindapp.utils import user_cache_dir
+
+# The bundled dm6 gene annotation, usable directly as `-g dm6`.
+DM6_GTF = os.path.join(
+    os.path.dirname(__file__), "reference_files", "dmel-all-r6.46.gtf.gz"
+)
+
+
+def resolve_gtf(gtf: str):
+    """Maps the `dm6` shortcut of the --gtf option to the bundled annotation."""
+    return DM6_GTF if gtf == "dm6" else gtf
+
+
+def build_gene_index(gtf_file: str):
+    """Prebuilds the gene index of a GTF file in the user cache directory."""
+    from .bindapp.merge_class import GTF
+
+    GTF(gtf_file, cache_dir=user_cache_dir()).process_gtf()
+
 
 def copy_file(source_path, destination_directory="."):
     file_name = os.path.basename(source_path)
@@ -17,13 +36,15 @@ def main():
             shutil.copyfileobj(file_in, file_out)
             print("dm6 fasta file created")
 
-    with gzip.open(
-        os.path.dirname(__file__) + "/reference_files/dmel-all-r6.46.gtf.gz", "rb"
-    ) as file_in:
+    with gzip.open(DM6_GTF, "rb") as file_in:
         with open("dmel-all-r6.46.gtf", "wb") as file_out:
             shutil.copyfileobj(file_in, file_out)
             print("dm6 GTF file created")
 
+    build_gene_index(DM6_GTF)
+    build_gene_index("dmel-all-r6.46.gtf")
+    print(f"dm6 gene index built in {user_cache_dir()}")
+
     copy_file(os.path.dirname(__file__) + "/reference_files/dm6.fa.fai")
 
 
@@ -0,0 +1,124 @@
+"""Startup-time benchmark for the bindcompare console scripts.
+
+For every console script, runs `python -X importtime` on its module and reports the
+total import time, the slowest imported packages, and the wall clock of `--help`.
+Results can be appended to a CSV file to track startup time across commits.
+
+    python misc_vis/startup_benchmark.py [-r REPEATS] [--csv startup.csv]
+"""
+
+import argparse
+import csv
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# Console script name -> module, as in setup.py.
+CONSOLE_SCRIPTS = {
+    "bindcompare": "bindcompare.bindcompare",
+    "bindbatch": "bindcompare.batch",
+    "bindlaunch": "bindcompare.bcapp",
+    "retrievedm6": "bindcompare.retrieve",
+    "comparexp": "bindcompare.comparexp",
+    "bindexplore": "bindcompare.explore",
+}
+# Scripts with an argparse --help. The others start the GUI or write files.
+HAS_HELP = ["bindcompare", "bindbatch", "comparexp", "bindexplore"]
+
+
+def import_times(module: str):
+    """Returns {imported module: cumulative microseconds} for one fresh import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def help_time(module: str):
+    """Returns the wall clock seconds of `<script> --help`."""
+    start = time.perf_counter()
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys; sys.argv = ['x', '--help']; from {module} import main; main()",
+        ],
+        capture_output=True,
+    )
+    return time.perf_counter() - start
+
+
+def heaviest(times: dict, module: str, top: int):
+    """Returns the slowest top-level third-party packages pulled in by the module."""
+    packages = {}
+    for name, cumulative in times.items():
+        root = name.split(".")[0]
+        if root == module.split(".")[0]:
+            continue
+        packages[root] = max(packages.get(root, 0), cumulative)
+    return sorted(packages.items(), key=lambda item: -item[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the import and --help time of the console scripts."
+    )
+    parser.add_argument(
+        "-r", "--repeats", type=int, default=5, help="Runs per script (best is kept)."
+    )
+    parser.add_argument(
+        "--top", type=int, default=3, help="Number of heaviest packages to list."
+    )
+    parser.add_argument("--csv", help="Append the results to this CSV file.")
+    args = parser.parse_args()
+
+    rows = []
+    stamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"{'script':<14}{'import ms':>11}{'--help ms':>11}  heaviest imports")
+    for script, module in CONSOLE_SCRIPTS.items():
+        try:
+            runs = [import_times(module) for _ in range(args.repeats)]
+        except RuntimeError as e:
+            print(f"{script:<14}{'failed':>11}  {e}")
+            continue
+        best = min(runs, key=lambda times: times[module])
+        import_ms = best[module] / 1000
+        help_ms = float("nan")
+        if script in HAS_HELP:
+            help_ms = 1000 * min(help_time(module) for _ in range(args.repeats))
+        packages = ", ".join(
+            f"{name} {us / 1000:.0f}ms" for name, us in heaviest(best, module, args.top)
+        )
+        print(f"{script:<14}{import_ms:>11.1f}{help_ms:>11.1f}  {packages}")
+        rows.append(
+            {
+                "date": stamp,
+                "script": script,
+                "import_ms": round(import_ms, 1),
+                "help_ms": round(help_ms, 1),
+            }
+        )
+
+    if args.csv:
+        new_file = not os.path.isfile(args.csv)
+        with open(args.csv, "a", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=list(rows[0]))
+            if new_file:
+                writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
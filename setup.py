@@ -35,7 +35,6 @@ setup(
         "pandas>=1.0",
         "customtkinter>=1.0",
         "matplotlib>=3.0",
-        "biopython>=1.0",
         "intervaltree>=1.0",
         "matplotlib_venn>=0.11",
         "scipy>=1.0",
@@ -43,6 +42,7 @@ setup(
     entry_points={
         "console_scripts": [
             "bindcompare = bindcompare.bindcompare:main",
+            "bindbatch = bindcompare.batch:main",
             "bindlaunch = bindcompare.bcapp:main",
             "retrievedm6 = bindcompare.retrieve:main",
             "comparexp = bindcompare.comparexp:main",
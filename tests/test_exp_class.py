@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from bindcompare.bindapp.exp_class import BindCompare
+from bindcompare.bindapp.merge_class import Bed
+
+SCOPE = 200
+
+
+def write_bed(path, rng, num_peaks):
+    """Writes peaks of varied widths, with repeats, on two shared chromosomes and
+    one chromosome of their own."""
+    rows = ["track name=peaks"]
+    for chrom in ["chr2L", "chr3R", rng.choice(["chrX", "chr4"])]:
+        starts = rng.integers(0, 20000, num_peaks)
+        widths = rng.integers(1, 800, num_peaks)
+        for start, width in zip(starts, widths):
+            rows.append(f"{chrom}\t{start}\t{start + width}")
+        rows.append(rows[-1])
+    path.write_text("\n".join(rows) + "\n")
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def results(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp("beds")
+    rng = np.random.default_rng(7)
+    ref = write_bed(tmp_path / "ref.bed", rng, 150)
+    exp = write_bed(tmp_path / "exp.bed", rng, 300)
+    results = {}
+    for engine in ["numpy", "intervaltree"]:
+        ref_bed, exp_bed = Bed(ref, columnar=True), Bed(exp, columnar=True)
+        ref_bed.process_bed(True, SCOPE)
+        exp_bed.process_bed(False, SCOPE)
+        bc = BindCompare(ref_bed, exp_bed, SCOPE, engine)
+        bc.compare_binds()
+        bc_dict = bc.get_experiments_overlaps_it(ref_bed.get_chroms())
+        outdir = tmp_path / engine
+        outdir.mkdir()
+        bc.generate_csv(bc_dict, str(outdir / "T"), str(outdir), "T")
+        results[engine] = (bc_dict, outdir)
+    return results
+
+
+def test_engines_agree_on_counts_and_profiles(results):
+    numpy_dict, _ = results["numpy"]
+    tree_dict, _ = results["intervaltree"]
+    assert numpy_dict["overlap_counts"]["Total"] > 0
+    assert numpy_dict["overlap_counts"] == tree_dict["overlap_counts"]
+    for key in ["full", "front", "end", "ext"]:
+        np.testing.assert_array_equal(numpy_dict[key], tree_dict[key])
+
+
+def test_engines_agree_on_unique_masks(results):
+    numpy_dict, _ = results["numpy"]
+    tree_dict, _ = results["intervaltree"]
+    for key in [
+        "unique_ref_overlaps",
+        "unique_ola_overlaps",
+        "unique_ref_proxpeak",
+        "unique_exp_proxpeak",
+    ]:
+        np.testing.assert_array_equal(numpy_dict[key], tree_dict[key])
+
+
+def test_engines_agree_on_overlap_table(results):
+    numpy_dict, numpy_dir = results["numpy"]
+    tree_dict, tree_dir = results["intervaltree"]
+    np.testing.assert_array_equal(
+        np.sort(numpy_dict["overlaps"]), np.sort(tree_dict["overlaps"])
+    )
+    # The CSV is ordered independently of the order the engine found overlaps in.
+    for csv in ["T_overlaps.csv", "CategorizedCSVs/CRO_T_overlaps.csv"]:
+        assert (numpy_dir / csv).read_text() == (tree_dir / csv).read_text()
@@ -0,0 +1,51 @@
+import numpy as np
+
+from bindcompare.explore import ProcessManager
+
+SCOPE = 500
+
+
+def write_bed(path, rng, num_peaks):
+    """Writes peaks of varied widths, with repeats, on two chromosomes."""
+    rows = []
+    for chrom in ["chr2L", "chr3R"]:
+        starts = rng.integers(0, 400000, num_peaks)
+        widths = rng.integers(1, 1200, num_peaks)
+        for start, width in zip(starts, widths):
+            rows.append(f"{chrom}\t{start}\t{start + width}")
+        rows.append(rows[-1])
+    path.write_text("\n".join(rows) + "\n")
+    return str(path)
+
+
+def test_complete_sketches_match_sparse_matrix(tmp_path):
+    rng = np.random.default_rng(3)
+    beds = [write_bed(tmp_path / f"{n}.bed", rng, 200 * n) for n in [1, 2, 3]]
+
+    exact = ProcessManager(beds, str(tmp_path / "exact"))
+    exact.process_bed_files(bin_size=SCOPE)
+    exact.compute_overlaps()
+
+    approximate = ProcessManager(beds, str(tmp_path / "approximate"))
+    approximate.sketch_bed_files([SCOPE], 10**6, str(tmp_path / "cache"))
+    approximate.estimate_overlaps(bin_size=SCOPE)
+
+    np.testing.assert_allclose(approximate.correl, exact.correl)
+    np.testing.assert_array_equal(approximate.stderr, 0.0)
+
+
+def test_sketch_estimates_lie_within_their_standard_errors(tmp_path):
+    rng = np.random.default_rng(5)
+    beds = [write_bed(tmp_path / f"{n}.bed", rng, 300 * n) for n in [1, 2, 3]]
+
+    exact = ProcessManager(beds, str(tmp_path / "exact"))
+    exact.process_bed_files(bin_size=SCOPE)
+    exact.compute_overlaps()
+
+    approximate = ProcessManager(beds, str(tmp_path / "approximate"))
+    approximate.sketch_bed_files([SCOPE], 256, str(tmp_path / "cache"))
+    approximate.estimate_overlaps(bin_size=SCOPE)
+
+    assert approximate.stderr.max() > 0
+    error = np.abs(approximate.correl - exact.correl)
+    assert np.all(error <= 4 * approximate.stderr + 1e-12)
@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+
+from bindcompare.bindapp import merge_class
+from bindcompare.bindapp.merge_class import GTF, Bed
+
+BED_ROWS = [
+    "track name=peaks",
+    "browser position chr2L:1-1000",
+    "chr2L\t100\t200\tpeak0\t5\t+",
+    "chr2L\t300\t450\tpeak1\t5\t-",
+    "chrX\t50\t80",
+    "chrUn_x\t10\t20",
+]
+
+GTF_ROWS = [
+    'chr2L\tFlyBase\tgene\t7529\t9484\t.\t+\t.\tgene_id "FBgn0031208";',
+    'chr2L\tFlyBase\tgene\t9839\t21376\t.\t-\t.\tgene_id "FBgn0002121";',
+]
+
+
+def test_columnar_bed_skips_track_lines(tmp_path):
+    bedfile = tmp_path / "peaks.bed"
+    bedfile.write_text("\n".join(BED_ROWS) + "\n")
+
+    columnar = Bed(str(bedfile), columnar=True)
+    columnar.process_bed(True, 1000)
+    rows = Bed(str(bedfile))
+    rows.process_bed(True, 1000)
+
+    assert sorted(columnar.get_chroms()) == ["2L", "X"]
+    assert sorted(columnar.get_chroms()) == sorted(rows.get_chroms())
+    np.testing.assert_array_equal(
+        columnar.get_chrom_array("2L"), [[100, 200], [300, 450]]
+    )
+    np.testing.assert_array_equal(columnar.get_chrom_array("X"), [[50, 80]])
+
+
+def test_gtf_index_is_rehashed_only_when_the_file_changes(tmp_path, monkeypatch):
+    gtf_file = tmp_path / "genes.gtf"
+    gtf_file.write_text("\n".join(GTF_ROWS) + "\n")
+    cache_dir = str(tmp_path / "cache")
+    GTF(str(gtf_file), cache_dir=cache_dir).process_gtf()
+
+    hashed = []
+    file_digest = merge_class.file_digest
+
+    def counted_digest(path):
+        hashed.append(path)
+        return file_digest(path)
+
+    def no_parse(self):
+        raise AssertionError("the index was rebuilt")
+
+    monkeypatch.setattr(merge_class, "file_digest", counted_digest)
+    monkeypatch.setattr(GTF, "parse_gtf", no_parse)
+    warm = GTF(str(gtf_file), cache_dir=cache_dir)
+    warm.process_gtf()
+    assert hashed == []
+    assert list(warm.genes) == ["FBgn0031208", "FBgn0002121"]
+
+    # Touching the file costs one hash, and the index is kept.
+    stat = os.stat(gtf_file)
+    os.utime(gtf_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    GTF(str(gtf_file), cache_dir=cache_dir).process_gtf()
+    GTF(str(gtf_file), cache_dir=cache_dir).process_gtf()
+    assert hashed == [str(gtf_file)]